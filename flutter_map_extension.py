@@ -21,19 +21,21 @@
 Description of this extension
 """
 
-import logging
+# NOTE: every module imported here is already loaded by inkex itself (see tests/test_import_time.py), 
+# the ones only needed by some operation modes (array, heapq, json, csv, gzip, numpy...) are imported where they are used
+from bisect import bisect_left
 import math
+import os
 import random
-from typing import Any, Dict, List, Tuple, Union
+from typing import Any, Callable, Collection, Dict, Iterator, List, Optional, Tuple, Type, TypeVar, Union
 import inkex 
 from inkex.units import convert_unit
 import re
 from inkex.utils import debug as alert
 import inkex.elements._polygons as polygons
-import inkex.elements._selected as selected
 
+from dataclasses import dataclass, field, fields, asdict
 from enum import Enum
-from typing import Union, Optional, TypeVar, Type
 
 T = TypeVar('T', bound='DictLikeEnum')
 
@@ -57,6 +59,356 @@ class DictLikeEnum(Enum):
             return None
 
 
+class BoundingBoxRTree:
+    """
+    R-tree over axis aligned bounding boxes, bulk loaded with the Sort-Tile-Recursive algorithm.
+    Entries can also be inserted / deleted afterwards (least enlargement insertion, nodes split in halves along their longest side).
+
+    Used as broad phase for geometric queries: a rectangle query only visits the nodes overlapping it
+    instead of testing every stored box, and nearest queries visit the nodes by increasing distance.
+    Each entry is a tuple ((min_x, min_y, max_x, max_y), item).
+    """
+    # Node layout: [min_x, min_y, max_x, max_y, children, item], leaf entries have children=None and a 7th slot with their insertion order
+    NODE_CAPACITY = 16
+
+    def __init__(self, entries=(), node_capacity: int = NODE_CAPACITY):
+        self.node_capacity = max(2, node_capacity)
+        nodes = [[box[0], box[1], box[2], box[3], None, item, order] for order, (box, item) in enumerate(entries)]
+        self.size = len(nodes)
+        self._next_order = len(nodes)
+
+        if not nodes:
+            self.root = None
+            return
+
+        # pack levels bottom-up until a single root node remains
+        while len(nodes) > self.node_capacity:
+            nodes = self._pack_level(nodes)
+        self.root = self._make_parent(nodes)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _make_parent(self, children: list) -> list:
+        return [
+            min(c[0] for c in children),
+            min(c[1] for c in children),
+            max(c[2] for c in children),
+            max(c[3] for c in children),
+            children,
+            None,
+        ]
+
+    def _pack_level(self, nodes: list) -> list:
+        """ Groups the nodes into parents of node_capacity children: vertical slices by x center, then runs by y center """
+        capacity = self.node_capacity
+        parents_count = math.ceil(len(nodes) / capacity)
+        slice_size = math.ceil(math.sqrt(parents_count)) * capacity
+
+        nodes.sort(key=lambda n: n[0] + n[2])
+        parents = []
+        for slice_start in range(0, len(nodes), slice_size):
+            vertical_slice = sorted(nodes[slice_start:slice_start + slice_size], key=lambda n: n[1] + n[3])
+            for group_start in range(0, len(vertical_slice), capacity):
+                parents.append(self._make_parent(vertical_slice[group_start:group_start + capacity]))
+        return parents
+
+    def insert(self, box: Tuple[float, float, float, float], item):
+        """ Adds an entry to the tree """
+        leaf = [box[0], box[1], box[2], box[3], None, item, self._next_order]
+        self._next_order += 1
+        self.size += 1
+        if self.root is None:
+            self.root = self._make_parent([leaf])
+            return
+
+        sibling = self._insert(self.root, leaf)
+        if sibling is not None:
+            self.root = self._make_parent([self.root, sibling])
+
+    def _insert(self, node: list, leaf: list) -> Optional[list]:
+        """ Inserts the leaf under node, returns the new sibling of node if it had to be split """
+        node[0], node[1] = min(node[0], leaf[0]), min(node[1], leaf[1])
+        node[2], node[3] = max(node[2], leaf[2]), max(node[3], leaf[3])
+
+        children = node[4]
+        if children[0][4] is None:  # bottom level, holds the leaf entries (all the leaves are at the same depth)
+            children.append(leaf)
+        else:
+            area = lambda n: (n[2] - n[0]) * (n[3] - n[1])
+            enlarged_area = lambda n: (max(n[2], leaf[2]) - min(n[0], leaf[0])) * (max(n[3], leaf[3]) - min(n[1], leaf[1]))
+            best_child = min(children, key=lambda child: (enlarged_area(child) - area(child), area(child)))
+            sibling = self._insert(best_child, leaf)
+            if sibling is not None:
+                children.append(sibling)
+
+        if len(children) <= self.node_capacity:
+            return None
+        # split in halves along the longest side of the node
+        if node[2] - node[0] >= node[3] - node[1]:
+            children.sort(key=lambda n: n[0] + n[2])
+        else:
+            children.sort(key=lambda n: n[1] + n[3])
+        half = len(children) // 2
+        sibling = self._make_parent(children[half:])
+        node[:] = self._make_parent(children[:half])
+        return sibling
+
+    def delete(self, box: Tuple[float, float, float, float], item) -> bool:
+        """ Removes the entry with the given box & item, returns False if there is no such entry """
+        if self.root is None or not self._delete(self.root, box, item):
+            return False
+        self.size -= 1
+        if not self.root[4]:
+            self.root = None
+        return True
+
+    def _delete(self, node: list, box: Tuple[float, float, float, float], item) -> bool:
+        children = node[4]
+        for index, child in enumerate(children):
+            # only the children containing the box may hold the entry
+            if child[0] > box[0] or child[1] > box[1] or child[2] < box[2] or child[3] < box[3]:
+                continue
+            if child[4] is None:
+                if child[5] != item:
+                    continue
+                del children[index]
+            elif self._delete(child, box, item):
+                if not child[4]:
+                    del children[index]
+            else:
+                continue
+            # shrink the node to its remaining children (empty nodes are removed by their parent)
+            if children:
+                node[:4] = self._make_parent(children)[:4]
+            return True
+        return False
+
+    def query(self, min_x: float, min_y: float, max_x: float, max_y: float) -> list:
+        """ Returns the items whose bounding box overlaps the given rectangle (borders included) """
+        found = []
+        if self.root is None:
+            return found
+
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            for child in node[4]:
+                if child[0] > max_x or child[2] < min_x or child[1] > max_y or child[3] < min_y:
+                    continue
+                if child[4] is None:
+                    found.append(child[5])
+                else:
+                    stack.append(child)
+        return found
+
+    def nearest(self, x: float, y: float, max_distance: float = math.inf,
+                within: Optional[Callable[[float, float, float, float], bool]] = None) -> Iterator[Tuple[float, Any]]:
+        """
+        Yields (distance, item) for the entries within max_distance (included) of (x, y), by increasing distance to their box
+        (ties in insertion order). The tree is explored lazily (best first), so stopping early only visits the nodes near (x, y).
+        If a within(min_x, min_y, max_x, max_y) test is given, only the nodes & entries whose box passes it are visited / yielded
+        (it must also pass for every node enclosing a passing box, e.g. "overlaps a region").
+        """
+        if self.root is None:
+            return
+        import heapq
+
+        # heap entries: (distance, tie breaker, push counter, node). Nodes use -1 as tie breaker so they are expanded
+        # before yielding a leaf at the same distance
+        heap = [(0.0, -1, 0, self.root)]
+        push_counter = 1
+        while heap:
+            distance, _, _, node = heapq.heappop(heap)
+            if node[4] is None:
+                yield distance, node[5]
+                continue
+            for child in node[4]:
+                if within is not None and not within(child[0], child[1], child[2], child[3]):
+                    continue
+                dx = max(child[0] - x, 0.0, x - child[2])
+                dy = max(child[1] - y, 0.0, y - child[3])
+                child_distance = math.sqrt(dx * dx + dy * dy)
+                if child_distance > max_distance:
+                    continue
+                heapq.heappush(heap, (child_distance, child[6] if child[4] is None else -1, push_counter, child))
+                push_counter += 1
+
+
+class CompactGraph:
+    """
+    Compact undirected graph over id numbered nodes (e.g. the navigation points), backed by typed arrays:
+        - node_ids: array('i') with the id number of each node, sorted (the node index is its position, ids map back through bisect)
+        - offsets / targets: CSR adjacency, the neighbours of node i are targets[offsets[i]:offsets[i + 1]] (sorted node indexes)
+        - xs / ys: array('d') node coordinates (empty if no coordinates were given)
+        - handles: optional per node objects (e.g. the svg elements)
+
+    Built straight from the flat id arrays parsed from the DOM ids (see from_links and FlutterMapExtension.collect_navigation_graph),
+    with no intermediate dict of lists, and written back to the DOM ids per node (see FlutterMapExtension.write_compact_graph_ids).
+    Traversals (connected components, clustering, chain contraction) only touch contiguous arrays.
+    """
+    __slots__ = ('node_ids', 'offsets', 'targets', 'xs', 'ys', 'handles')
+
+    def __init__(self, node_ids: 'array', offsets: 'array', targets: 'array', xs: 'array', ys: 'array', handles: Optional[List[Any]] = None):
+        self.node_ids = node_ids
+        self.offsets = offsets
+        self.targets = targets
+        self.xs = xs
+        self.ys = ys
+        self.handles = handles
+
+    @classmethod
+    def from_links(cls, node_ids: 'array', link_sources: 'array', link_targets: 'array', handles: Optional[List[Any]] = None) -> 'CompactGraph':
+        """
+        Builds the graph from flat arrays: the id number of every node (any order, handles in the same order) and its links 
+        as (source id, target id) pairs. Links are made symmetric, links to ids that are not nodes and self links are ignored.
+        If an id number is repeated the last node wins. Sorting & deduplication are done with numpy on the whole arrays at once.
+        """
+        from array import array
+        import numpy as np
+
+        ids = np.asarray(node_ids, dtype=np.int64)
+        # last node of every id number, in ascending id order
+        _, last_from_end = np.unique(ids[::-1], return_index=True)
+        kept_nodes = len(ids) - 1 - last_from_end
+        sorted_ids = ids[kept_nodes]
+        count = len(sorted_ids)
+
+        def to_indexes(values: 'np.ndarray') -> Tuple['np.ndarray', 'np.ndarray']:
+            positions = np.searchsorted(sorted_ids, values)
+            found = positions < count
+            found[found] = sorted_ids[positions[found]] == values[found]
+            return positions, found
+
+        sources, source_found = to_indexes(np.asarray(link_sources, dtype=np.int64))
+        targets, target_found = to_indexes(np.asarray(link_targets, dtype=np.int64))
+        valid = source_found & target_found & (sources != targets)
+        sources, targets = sources[valid], targets[valid]
+
+        # both directions of every link, deduplicated & sorted by (row, target) through a single int64 key
+        keys = np.unique(np.concatenate((sources * count + targets, targets * count + sources)))
+        rows, columns = np.divmod(keys, max(count, 1))
+        offsets = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=count), out=offsets[1:])
+
+        node_handles = [handles[index] for index in kept_nodes.tolist()] if handles is not None else None
+        return cls(array('i', sorted_ids.astype(np.intc).tobytes()), array('i', offsets.astype(np.intc).tobytes()), 
+                   array('i', columns.astype(np.intc).tobytes()), array('d'), array('d'), node_handles)
+
+    @classmethod
+    def from_adjacency(cls, adjacency: Dict[int, List[int]], coordinates: Optional[Dict[int, Tuple[float, float]]] = None,
+                       handles: Optional[Dict[int, Any]] = None) -> 'CompactGraph':
+        """
+        Builds the graph from the neighbour id lists of every node (see from_links). Links are made symmetric, 
+        links to ids that are not nodes and self links are ignored.
+        """
+        from array import array
+
+        node_ids = array('i', adjacency)
+        link_sources, link_targets = array('i'), array('i')
+        for node_id, neighbours in adjacency.items():
+            link_sources.extend(node_id for _ in neighbours)
+            link_targets.extend(neighbours)
+        graph = cls.from_links(node_ids, link_sources, link_targets, 
+                               handles=[handles.get(node_id) for node_id in node_ids] if handles is not None else None)
+        if coordinates is not None:
+            graph.xs.extend(coordinates[node_id][0] for node_id in graph.node_ids)
+            graph.ys.extend(coordinates[node_id][1] for node_id in graph.node_ids)
+        return graph
+
+    def __contains__(self, node_id: int) -> bool:
+        return self.index_of(node_id) is not None
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    def index_of(self, node_id: int) -> Optional[int]:
+        """ Node index of an id number, None if there is no such node """
+        index = bisect_left(self.node_ids, node_id)
+        return index if index < len(self.node_ids) and self.node_ids[index] == node_id else None
+
+    def neighbours(self, index: int) -> 'array':
+        return self.targets[self.offsets[index]:self.offsets[index + 1]]
+
+    def neighbour_ids(self, index: int) -> List[int]:
+        return [self.node_ids[neighbour] for neighbour in self.neighbours(index)]
+
+    def degree(self, index: int) -> int:
+        return self.offsets[index + 1] - self.offsets[index]
+
+    def edges(self) -> Iterator[Tuple[int, int]]:
+        """ Yields every link once as (index A, index B) with A < B, sorted """
+        offsets, targets = self.offsets, self.targets
+        for index in range(len(self.node_ids)):
+            for position in range(offsets[index], offsets[index + 1]):
+                if targets[position] > index:
+                    yield index, targets[position]
+
+    def connected_components(self) -> 'array':
+        """ Component number of every node (numbered from 0 in order of their lowest node index), O(V+E) """
+        from array import array
+
+        offsets, targets = self.offsets, self.targets
+        labels = array('i', [-1]) * len(self.node_ids)
+        component = 0
+        for start in range(len(self.node_ids)):
+            if labels[start] != -1:
+                continue
+            labels[start] = component
+            stack = [start]
+            while stack:
+                index = stack.pop()
+                for position in range(offsets[index], offsets[index + 1]):
+                    neighbour = targets[position]
+                    if labels[neighbour] == -1:
+                        labels[neighbour] = component
+                        stack.append(neighbour)
+            component += 1
+        return labels
+
+    def contract_chains(self, keep: 'array') -> List[Tuple[int, int, List[int]]]:
+        """
+        Contracts every chain of degree-2 nodes into a single link between the nodes at its ends, O(V+E).
+        keep flags (1 / 0 by node index) the nodes that must never be contracted, on top of the ones whose degree is not 2.
+
+        Returns the links of the contracted graph as (index A, index B, path), path being every node index from A to B
+        (both included, only A and B for links that were not contracted). Cycles with no node to keep are kept from their lowest node.
+        """
+        from array import array
+
+        offsets, targets = self.offsets, self.targets
+        kept = array('b', (1 if keep[index] or self.degree(index) != 2 else 0 for index in range(len(self.node_ids))))
+        visited = array('b', [0]) * len(self.node_ids)
+        links: List[Tuple[int, int, List[int]]] = []
+
+        def walk_from(start: int):
+            for position in range(offsets[start], offsets[start + 1]):
+                previous, current = start, targets[position]
+                if kept[current]:
+                    if start <= current:
+                        links.append((start, current, [start, current]))
+                    continue
+                if visited[current]:  # chain already walked from its other end
+                    continue
+                path = [start]
+                while not kept[current]:
+                    visited[current] = 1
+                    path.append(current)
+                    first, second = targets[offsets[current]], targets[offsets[current] + 1]
+                    previous, current = current, (second if first == previous else first)
+                path.append(current)
+                links.append((start, current, path))
+
+        for index in range(len(self.node_ids)):
+            if kept[index]:
+                walk_from(index)
+        for index in range(len(self.node_ids)):
+            if not kept[index] and not visited[index]:
+                kept[index] = 1
+                walk_from(index)
+        return links
+
+
 class FlutterMapExtension(inkex.EffectExtension):
     POINT_ID_REGEX = re.compile(r'^point-(\d+)(?:=([\d-]*))?$')
     # point-43=44-39-45
@@ -76,6 +428,71 @@ class FlutterMapExtension(inkex.EffectExtension):
     # │      │        └‒‒‒‒‒ unique ID of the object
     # │      └‒‒‒‒‒ subtype of the object (required for stairs and toilet)
     # └‒‒‒‒‒ class of the object
+
+    NAV_LINE_ID_REGEX = re.compile(r'^nav_line-(\d+)-(\d+)$')
+    # nav_line-43-44
+    #          │  └‒‒‒‒‒ unique ID of point B
+    #          └‒‒‒‒‒ unique ID of point A
+
+    # Same patterns for documents using the compact base-36 id numbers (e.g. point-z=10-1a).
+    # Most documents are decimal, so these are only compiled the first time a base-36 document is handled (see set_id_base)
+    BASE36_ID_PATTERNS = (
+        r'^point-([0-9a-z]+)(?:=([0-9a-z-]*))?$',
+        r'^((?!point-)[a-zA-Z]+)-(?:([a-zA-Z]+)-)?([0-9a-z]+)=([0-9a-z]+)$',
+        r'^nav_line-([0-9a-z]+)-([0-9a-z]+)$',
+    )
+    DECIMAL_ID_REGEXES = (POINT_ID_REGEX, BUILDING_ID_REGEX, NAV_LINE_ID_REGEX)
+    BASE36_ID_REGEXES: Optional[Tuple[re.Pattern, re.Pattern, re.Pattern]] = None
+
+    # Numeric base of the id numbers written in the document, declared on the svg root by ID_ENCODING_ATTR (decimal when missing)
+    ID_ENCODING_ATTR = 'flutter_maps:id_encoding'
+    BASE36_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+    id_base: int = 10
+
+    class IDEncoding(DictLikeEnum):
+        """Numeric encoding of the id numbers (points, buildings & lines ids)"""
+        KEEP = 'keep'
+        DECIMAL = 'decimal'
+        BASE36 = 'base36'
+
+    @classmethod
+    def set_id_base(cls, base: int):
+        """ Switches the numeric base (and the regexes matching it) used to read and write id numbers """
+        assert base in (10, 36), f'Unsupported id base: {base}'
+        FlutterMapExtension.id_base = base
+        if base == 36 and FlutterMapExtension.BASE36_ID_REGEXES is None:
+            FlutterMapExtension.BASE36_ID_REGEXES = tuple(re.compile(pattern) for pattern in cls.BASE36_ID_PATTERNS) # type: ignore
+        FlutterMapExtension.POINT_ID_REGEX, FlutterMapExtension.BUILDING_ID_REGEX, FlutterMapExtension.NAV_LINE_ID_REGEX = \
+            cls.BASE36_ID_REGEXES if base == 36 else cls.DECIMAL_ID_REGEXES
+
+    def clean_up(self):
+        """ 
+        The id base & regexes are class level state (shared with the module level floor workers), 
+        so every run restores the decimal default once done: a base-36 run never leaks into later runs or callers of the same process
+        """
+        self.set_id_base(10)
+        super().clean_up()
+
+    @classmethod
+    def encode_id_number(cls, number: Union[int, str]) -> str:
+        """ Writes an id number using the current id base """
+        number = int(number)
+        if cls.id_base == 10 or number == 0:
+            return str(number)
+        digits = []
+        while number:
+            number, remainder = divmod(number, cls.id_base)
+            digits.append(cls.BASE36_DIGITS[remainder])
+        return ''.join(reversed(digits))
+
+    @classmethod
+    def decode_id_number(cls, text: str) -> int:
+        """ Reads an id number written using the current id base """
+        return int(text, cls.id_base)
+
+    @classmethod
+    def build_nav_line_id(cls, a_id: Union[int, str], b_id: Union[int, str]) -> str:
+        return f'nav_line-{cls.encode_id_number(a_id)}-{cls.encode_id_number(b_id)}'
     
     @classmethod
     def get_building_id_number(cls, id_attr: str) -> Union[int, None]:
@@ -84,7 +501,7 @@ class FlutterMapExtension(inkex.EffectExtension):
         matches = cls.BUILDING_ID_REGEX.match(id_attr)
         if not matches:
             return None
-        return int(matches.group(3))
+        return cls.decode_id_number(matches.group(3))
     
     @classmethod
     def is_element_a_point(cls, id_attr: str) -> bool:
@@ -107,9 +524,8 @@ class FlutterMapExtension(inkex.EffectExtension):
         matches = cls.POINT_ID_REGEX.match(id_attr)
         if not matches:
             return None
-        return int(matches.group(1))
+        return cls.decode_id_number(matches.group(1))
 
-    from typing import Callable, Collection
     @staticmethod
     def get_max_existing_object_id(ids_set:Collection, id_number_provider: Callable[[str], Union[int, None]]) -> int:
         """
@@ -133,11 +549,20 @@ class FlutterMapExtension(inkex.EffectExtension):
     class SmartConnectTypes(DictLikeEnum):
         """Smart connect algorithms supported by the extension."""
         NEAREST_POINT = 'nearest_point'
+        AXIS_ALIGNED = 'axis_aligned'
+        VISIBILITY_GRAPH = 'visibility_graph'
 
     class IDReplacementTypes(DictLikeEnum):
         """Strategy for replacing an element id"""
         RANDOM = 'random'
-        
+        RENUMBER = 'renumber'
+
+    class OperationScope(DictLikeEnum):
+        """Elements the connect, clean ids and add building operations work on"""
+        SELECTION = 'selection'
+        CURRENT_LAYER = 'current_layer'
+        NAMED_LAYER = 'named_layer'
+        DOCUMENT = 'document'
 
 
     class PointConnectionOptions:
@@ -165,6 +590,8 @@ class FlutterMapExtension(inkex.EffectExtension):
             self.copy_transform = copy_transform
             self.sort_mode = sort_mode
             self.sort_direction = sort_direction
+            # style attribute of the connection lines, serialized once for all the lines
+            self.line_style = str(inkex.Style({'stroke': line_color, 'stroke-width': lines_stroke}))
 
         @classmethod
         def from_extension_options(cls, options) -> 'FlutterMapExtension.PointConnectionOptions':
@@ -356,13 +783,13 @@ class FlutterMapExtension(inkex.EffectExtension):
         if not id_match:
             return (None, [])
 
-        unique_id_number = int(id_match.group(1))
+        unique_id_number = FlutterMapExtension.decode_id_number(id_match.group(1))
 
         linked_elements_substring = id_match.group(2)
         if not linked_elements_substring:
             return (unique_id_number, [])
 
-        linked_elements_id_list = [int(linked_id) for linked_id in linked_elements_substring.split('-')]
+        linked_elements_id_list = [FlutterMapExtension.decode_id_number(linked_id) for linked_id in linked_elements_substring.split('-') if linked_id]
 
         return (unique_id_number, linked_elements_id_list)
 
@@ -394,33 +821,37 @@ class FlutterMapExtension(inkex.EffectExtension):
         connections_str = building_match.group(4)  # Connections as string
         
         # Parse unique ID
-        unique_id_number = int(unique_id_str)
+        unique_id_number = FlutterMapExtension.decode_id_number(unique_id_str)
         
         # Parse linked elements (left as list of integers as tough to a future use case allowing buildings to have multiple entrances/point relationships)
         linked_elements_id_list = []
         if connections_str:
             for linked_id in connections_str.split('-'):
-                linked_elements_id_list.append(int(linked_id))
+                linked_elements_id_list.append(FlutterMapExtension.decode_id_number(linked_id))
                 # Skip invalid connection IDs but continue parsing
                 continue
         
         return (building_type, building_subtype, unique_id_number, linked_elements_id_list)
 
-    @staticmethod
-    def build_point_id_attr(id, neighbors_list):
+    @classmethod
+    def build_point_id_attr(cls, id, neighbors_list):
+        """ 
+        Builds a point id attribute. Neighbours are deduplicated and written in ascending order 
+        so the same graph always produces the same id string
+        """
         if neighbors_list:
-            neighbors_list_str = {str(n) for n in neighbors_list}
-            return f"point-{id}={'-'.join(neighbors_list_str)}"
+            sorted_neighbors = sorted({int(n) for n in neighbors_list})
+            return f"point-{cls.encode_id_number(id)}={'-'.join(cls.encode_id_number(n) for n in sorted_neighbors)}"
         else:
-            return f"point-{id}"
+            return f"point-{cls.encode_id_number(id)}"
     
-    @staticmethod
-    def build_building_id_attr(building_type: str, building_subtype: Union[str, None, ], id: int, entrance_ids: List[int]): 
+    @classmethod
+    def build_building_id_attr(cls, building_type: str, building_subtype: Union[str, None, ], id: int, entrance_ids: List[int]): 
         # Optional subtype and entrances id list
         return f"{building_type}-" + \
                 (f"{building_subtype}-" if building_subtype else "") + \
-                f"{id}=" + \
-                ('-'.join([str(eid) for eid in entrance_ids]) if entrance_ids else '')
+                f"{cls.encode_id_number(id)}=" + \
+                ('-'.join([cls.encode_id_number(eid) for eid in entrance_ids]) if entrance_ids else '')
 
     @staticmethod
     def extract_unit_from_text_expression(text:str) -> tuple[Union[float, None], Union[str, None]]:
@@ -430,6 +861,7 @@ class FlutterMapExtension(inkex.EffectExtension):
         Return a tuple (number, unit_id) if successful, or (None, None) if the input is invalid.
         tuple is tough to be used with inkex.units.convert_unit function.
         """
+        import logging # only needed to report invalid expressions, not worth loading on every run
         logger = logging.getLogger()
 
 
@@ -458,10 +890,10 @@ class FlutterMapExtension(inkex.EffectExtension):
 
 
     def add_arguments(self, pars):
-        pars.add_argument("--tab", choices=["Operation Mode", "Options", "Help", "building_options"])
+        pars.add_argument("--tab", choices=["Operation Mode", "Options", "Help", "building_options", "multi_floor_options"])
         # Operation Mode tab
         pars.add_argument("--operation_mode", 
-                          choices=["connect", "clean", "add_building", "clean_ids"],
+                          choices=["connect", "clean", "prune", "merge_points", "connectivity_report", "refresh_lines", "add_building", "navigation_mesh", "import_graph", "clean_ids", "multi_floor"],
                           default="connect")
 
         # Connection mode options
@@ -475,6 +907,11 @@ class FlutterMapExtension(inkex.EffectExtension):
         pars.add_argument("--considerEllipses", type=inkex.Boolean, default=True)
         pars.add_argument("--considerCircles", type=inkex.Boolean, default=True)
         pars.add_argument("--considerPath", type=inkex.Boolean, default=False)
+        pars.add_argument("--dry_run", type=inkex.Boolean, default=False)
+        pars.add_argument("--stream_output", type=inkex.Boolean, default=False)
+        pars.add_argument("--id_encoding", choices=['keep', 'decimal', 'base36'], type=str, default='keep')
+        pars.add_argument("--scope", choices=['selection', 'current_layer', 'named_layer', 'document'], type=str, default='selection')
+        pars.add_argument("--scope_layer", type=str, default='')
 
 
         # Sorting options
@@ -484,11 +921,15 @@ class FlutterMapExtension(inkex.EffectExtension):
         # Clean connection options
         pars.add_argument("--clean_lines", type=inkex.Boolean, default=True)
         pars.add_argument("--delete_malformed", type=inkex.Boolean, default=True)
+        pars.add_argument("--prune_isolated", type=inkex.Boolean, default=True)
+        pars.add_argument("--prune_unreachable", type=inkex.Boolean, default=True)
+        pars.add_argument("--color_components", type=inkex.Boolean, default=False)
+        pars.add_argument("--merge_tolerance", type=str, default="1px")
 
         # Clean IDs options
         pars.add_argument("--clean_points", type=inkex.Boolean, default=True)
         pars.add_argument("--clean_buildings", type=inkex.Boolean, default=False)
-        pars.add_argument("--id_replace_type", choices=['random'], type=str, default='random')
+        pars.add_argument("--id_replace_type", choices=['random', 'renumber'], type=str, default='random')
 
 
         # Building type options
@@ -515,6 +956,8 @@ class FlutterMapExtension(inkex.EffectExtension):
                                 '10%-to-border-in', '10%-to-border-out'], 
                         type=str, default='border-to-boder-out')
         pars.add_argument("--custom_point_separation", type=str, default='10px-in-border')
+        pars.add_argument("--link_entrances", type=inkex.Boolean, default=False)
+        pars.add_argument("--entrance_link_max_distance", type=str, default='10px')
 
         # Smart Connect parameters
         pars.add_argument("--smart_connect_enabled", type=inkex.Boolean, default=False)
@@ -524,6 +967,30 @@ class FlutterMapExtension(inkex.EffectExtension):
         pars.add_argument("--ignore_building_point", type=inkex.Boolean, default=True)
         pars.add_argument("--filter_non_points", type=inkex.Boolean, default=True)
         pars.add_argument("--max_radius", type=str, default="0.1px")
+
+        # Axis aligned connection options
+        pars.add_argument("--axis_tolerance", type=float, default=15.0)
+
+        # Visibility graph options (empty radius: every pair of points is a candidate)
+        pars.add_argument("--visibility_max_radius", type=str, default="")
+
+        # Multi floor options
+        pars.add_argument("--floor_layers_prefix", type=str, default="floor")
+        pars.add_argument("--floor_workers", type=int, default=0)
+        pars.add_argument("--graph_output", type=str, default="")
+        pars.add_argument("--contract_chains", type=inkex.Boolean, default=False)
+
+        # Obstacle avoidance options
+        pars.add_argument("--avoid_obstacles", type=inkex.Boolean, default=False)
+        pars.add_argument("--walls_layer", type=str, default="walls")
+
+        # Navigation mesh options
+        pars.add_argument("--mesh_spacing", type=str, default="10px")
+        pars.add_argument("--mesh_neighbourhood", type=int, choices=[4, 8], default=4)
+
+        # Import options
+        pars.add_argument("--import_file", type=str, default="")
+        pars.add_argument("--import_floor", type=str, default="")
     
 
     considerCircles:bool = True
@@ -544,11 +1011,23 @@ class FlutterMapExtension(inkex.EffectExtension):
 
     def effect(self):
         """ Main entry point of the extension """
+        self.change_set = self.ChangeSet()
+
         # global options
         FlutterMapExtension.considerCircles = self.options.considerCircles
         FlutterMapExtension.considerPath  = self.options.considerPath
         FlutterMapExtension.considerEllipses = self.options.considerEllipses
 
+        # elements the connect, clean ids and add building operations work on
+        self.operation_scope = self.OperationScope.get(self.options.scope)
+        assert self.operation_scope is not None, f'Invalid operation scope: {self.options.scope}'
+        self.scope_layer = self.options.scope_layer
+
+        # read / write ids with the document numeric base (re-encoding the document ids first if a different one was requested)
+        id_encoding = self.IDEncoding.get(self.options.id_encoding)
+        assert id_encoding is not None, f'Invalid id encoding: {self.options.id_encoding}'
+        self.apply_id_encoding(id_encoding)
+
         # Determine operation mode
         operation_mode = str(self.options.operation_mode).lower()
 
@@ -563,7 +1042,11 @@ class FlutterMapExtension(inkex.EffectExtension):
                     connection_options= FlutterMapExtension.PointConnectionOptions.from_extension_options(self.options),
                     ignore_building_point= self.options.ignore_building_point,
                     filter_non_points=self.options.filter_non_points,
-                    max_radius= self.options.max_radius
+                    max_radius= self.options.max_radius,
+                    avoid_obstacles= self.options.avoid_obstacles,
+                    walls_layer= self.options.walls_layer,
+                    axis_tolerance= self.options.axis_tolerance,
+                    visibility_max_radius= self.options.visibility_max_radius,
                 )
             else: 
                 self.sequentially_connect_points(
@@ -574,6 +1057,20 @@ class FlutterMapExtension(inkex.EffectExtension):
                 clean_lines=self.options.clean_lines,
                 delete_malformed=self.options.delete_malformed
             )
+        elif operation_mode == 'prune':
+            self.prune_points(
+                prune_isolated=self.options.prune_isolated,
+                prune_unreachable=self.options.prune_unreachable
+            )
+        elif operation_mode == 'merge_points':
+            self.merge_points(
+                tolerance=self.options.merge_tolerance,
+                copy_transform=self.options.copy_transform
+            )
+        elif operation_mode == 'connectivity_report':
+            self.report_connectivity(color_components=self.options.color_components)
+        elif operation_mode == 'refresh_lines':
+            self.refresh_lines(copy_transform=self.options.copy_transform)
         elif operation_mode == 'clean_ids':
             replacement_type = self.IDReplacementTypes.get(self.options.id_replace_type)
             assert replacement_type is not None, f'Invalid smart connect type: {self.options.smart_connect_type}'
@@ -598,69 +1095,181 @@ class FlutterMapExtension(inkex.EffectExtension):
                 entrance_point_options= FlutterMapExtension.EntrancePointOptions.from_extension_options(self.options),
                 sort_mode= self.options.sort_mode,
                 sort_direction= self.options.sort_direction,
+                link_entrances= self.options.link_entrances,
+                entrance_link_max_distance= self.options.entrance_link_max_distance,
+                connection_options= FlutterMapExtension.PointConnectionOptions.from_extension_options(self.options),
+                walls_layer= self.options.walls_layer,
+            )
+        elif operation_mode == 'navigation_mesh':
+            self.fill_navigation_mesh(
+                spacing= self.options.mesh_spacing,
+                neighbourhood= self.options.mesh_neighbourhood,
+                point_options= FlutterMapExtension.EntrancePointOptions.from_extension_options(self.options),
+                connection_options= FlutterMapExtension.PointConnectionOptions.from_extension_options(self.options),
+            )
+        elif operation_mode == 'import_graph':
+            self.import_graph(
+                import_file= self.options.import_file,
+                floor_label= self.options.import_floor,
+                point_options= FlutterMapExtension.EntrancePointOptions.from_extension_options(self.options),
+                connection_options= FlutterMapExtension.PointConnectionOptions.from_extension_options(self.options),
+            )
+        elif operation_mode == 'multi_floor':
+            self.compile_multi_floor_graph(
+                floor_layers_prefix= self.options.floor_layers_prefix,
+                graph_output= self.options.graph_output,
+                workers= self.options.floor_workers,
+                contract_chains= self.options.contract_chains,
             )
         else:
             raise NotImplementedError(f'Operation Mode not implemented: {self.options.operation_mode}')
 
+        if self.options.dry_run:
+            import json
+            self.msg(json.dumps(self.change_set.to_dict(), indent=2))
+            self.msg('\n=> Dry run: the document was not modified')
+        elif self.change_set.is_empty():
+            self.msg('\n=> Nothing changed, the document was not rewritten')
+
+    def load(self, stream):
+        """ 
+        Loads the svg document. Unlike inkex's default loader no deep copy of the original document is kept, 
+        as the change set (not a comparison of both serialized documents) tells whether the document has to be written back.
+        """
+        document = inkex.load_svg(stream)
+        self.svg = document.getroot()
+        self.svg.selection.set(*self.options.ids)
+        if not self.svg.selection and self.select_all:
+            self.svg.selection = self.svg.descendants().filter(*self.select_all)
+        return document
+
+    def has_changed(self, ret) -> bool:
+        """ The document is only serialized & written back if the operation changed something (never on dry runs) """
+        return not self.options.dry_run and not self.change_set.is_empty()
+
+    def save(self, stream):
+        """ 
+        Writes the document to the output stream. With the stream_output option the tree is serialized incrementally
+        (see write_document_incrementally) instead of building the whole output string first, gzip-compressed if the output file is a .svgz
+        """
+        if not self.options.stream_output:
+            return super().save(stream)
+
+        if isinstance(self.options.output, str) and self.options.output.lower().endswith('.svgz'):
+            import gzip
+            with gzip.GzipFile(fileobj=stream, mode='wb') as compressed_stream:
+                self.write_document_incrementally(self.document, compressed_stream)
+        else:
+            self.write_document_incrementally(self.document, stream)
+
+    @staticmethod
+    def write_document_incrementally(document, stream):
+        """ 
+        Serializes an xml document element by element through lxml's incremental writer, so only the tags being written 
+        are held in memory. The output is the same xml as etree.tostring, except that empty elements get an explicit end tag.
+        """
+        from lxml import etree
+
+        def write_element(xml_file, element, parent_nsmap: Dict):
+            if not isinstance(element.tag, str):  # comments, processing instructions & entities (tail included)
+                xml_file.write(element)
+                return
+            # only the namespaces not already declared by an ancestor are declared on the element
+            nsmap = element.nsmap
+            new_namespaces = {prefix: uri for prefix, uri in nsmap.items() if parent_nsmap.get(prefix) != uri}
+            with xml_file.element(element.tag, element.attrib, nsmap=new_namespaces or None):
+                if element.text:
+                    xml_file.write(element.text)
+                for child in element:
+                    write_element(xml_file, child, nsmap)
+            if element.tail:
+                xml_file.write(element.tail)
+
+        root = document.getroot()
+        with etree.xmlfile(stream) as xml_file:
+            if document.docinfo.doctype:
+                xml_file.write_doctype(document.docinfo.doctype)
+            for sibling in reversed(list(root.itersiblings(preceding=True))):
+                xml_file.write(sibling)
+            write_element(xml_file, root, {})
+        # the incremental writer does not accept anything after the root element, trailing comments / processing instructions are appended
+        for sibling in root.itersiblings():
+            stream.write(etree.tostring(sibling))
+
+    def set_element_id(self, element: inkex.elements.BaseElement, new_id: str):
+        """ Sets the id of an element, recording the rename in the change set (no-op if the id is the same) """
+        old_id = element.get('id')
+        if old_id == new_id:
+            return
+        element.set('id', new_id)
+        self.change_set.renamed_ids.append((old_id, new_id))
+
 
-    from dataclasses import dataclass
     @dataclass
     class PointInfo:
         """ DTO class used to wrap a point's svg element and required info for connection operations """
+        __slots__ = ('el', 'id', 'neighbours')
         el: inkex.elements.BaseElement
         id: str
-        neighbours: Union[List[int], List[str]]
+        neighbours: List[int]
     
     @dataclass
     class BuildingInfo:
         """ DTO class used to wrap a building's svg element and required info for connection operations """
+        __slots__ = ('el', 'id', 'type', 'subtype', 'neighbours', 'entrance_element')
         el: inkex.elements.BaseElement
         id: str
         type: str
         subtype: Union[str, None]
-        neighbours: Union[List[int], List[str]]
+        neighbours: List[int]
         entrance_element: Union[inkex.elements.BaseElement, None]
 
+    @dataclass
+    class ObstacleInfo:
+        """ DTO class used to wrap an obstacle (building / wall) outline in document coordinates """
+        el: inkex.elements.BaseElement
+        rings: List[List[Tuple[float, float]]]
+        closed: bool
+        entrance_ids: List[int]
+
+    @dataclass
+    class NavigationGraph:
+        """ DTO class holding the navigation elements of the document (see collect_navigation_graph) """
+        points: CompactGraph  # point id numbers and links (CSR), with the point elements as handles
+        buildings: List[Tuple[inkex.elements.BaseElement, str, Union[str, None], int, List[int]]]  # (element, type, subtype, id, entrance ids)
+        lines: List[Tuple[inkex.elements.BaseElement, int, int]]  # (element, point A id, point B id)
+        dangling_points: List[int]  # id numbers of the points whose id references points that do not exist
+
+        def point_element(self, point_id: int) -> Optional[inkex.elements.BaseElement]:
+            index = self.points.index_of(point_id)
+            return None if index is None else self.points.handles[index] # type: ignore
+
+    @dataclass
+    class ChangeSet:
+        """ DTO class collecting the changes an operation made to the document (reported on dry runs, empty means nothing to write back) """
+        renamed_ids: List[Tuple[str, str]] = field(default_factory=list)  # (old id, new id)
+        added_lines: List[str] = field(default_factory=list)
+        removed_elements: List[str] = field(default_factory=list)
+        created_entrances: List[str] = field(default_factory=list)
+        created_points: List[str] = field(default_factory=list)
+        created_layers: List[str] = field(default_factory=list)
+        updated_attributes: List[Tuple[str, str]] = field(default_factory=list)  # (element id, attribute name)
+
+        def is_empty(self) -> bool:
+            return not any(getattr(self, change.name) for change in fields(self))
+
+        def to_dict(self) -> Dict[str, Any]:
+            return asdict(self)
+
     def clean_point_connections(self, clean_lines: bool = True, delete_malformed: bool = True):
         """
         Deletes orphaned navigation lines and synchronizes neighbor references
-        in Point and Building IDs using indexed ID lookups.
+        in Point and Building IDs.
 
-        Optimized: single initial scan to collect PointInfo and BuildingInfo DTOs,
+        A single document walk collects the navigation graph (see collect_navigation_graph), 
         then targeted operations for lines inside the 'navigation' layer by id.
         """
-        # 1. Get all IDs currently in the document to avoid full DOM scans
-        all_elements_by_id = self.svg.get_ids()
-
-        # containers built in the first scan
-        points_by_intid: dict[int, FlutterMapExtension.PointInfo] = {}
-        buildings_by_intid: dict[int, FlutterMapExtension.BuildingInfo] = {}
-
-        # --- First pass: classify everything once and store parsed info ---
-        for id_str in all_elements_by_id:
-
-            # Attempt Point parse
-            point_id, p_neighbors = self._extract_relations_from_point(id_str=id_str)
-            if point_id is not None:
-                # Attempt Point parse
-                points_by_intid[int(point_id)] = self.PointInfo(
-                    el=self.svg.getElementById(id_str),
-                    id=str(point_id),
-                    neighbours=p_neighbors 
-                )
-                continue
-            # Attempt Building parse
-            building_id, b_neighbors, b_type ,b_subtype = self._extract_relations_from_building(id_str=id_str)
-            if building_id is not None:
-                buildings_by_intid[int(building_id)] = self.BuildingInfo(
-                    el=self.svg.getElementById(id_str),
-                    id=str(building_id),
-                    type=b_type, # type: ignore
-                    subtype=b_subtype,
-                    neighbours=b_neighbors,
-                    entrance_element=None
-                )
-                continue
+        graph = self.collect_navigation_graph()
 
         # --- Clean Lines (Navigation Paths) ---
         if clean_lines:
@@ -670,7 +1279,7 @@ class FlutterMapExtension(inkex.EffectExtension):
             )
             if nav_layer:
                 # expected pattern: nav_line-<A>-<B> where A and B are numeric point ids
-                line_id_re = re.compile(r'^nav_line-(\d+)-(\d+)$')
+                line_id_re = self.NAV_LINE_ID_REGEX
 
                 lines = nav_layer[0].xpath('.//*[starts-with(@id, "nav_line-")]')
                 for line in lines:
@@ -682,53 +1291,488 @@ class FlutterMapExtension(inkex.EffectExtension):
                         if delete_malformed: 
                             self.msg(f'\n=> A malformed navigation line ("{line_id}") was found, line will be deleted. You can connect again both points if you would like the extension to draw a new line')
                             line.getparent().remove(line)
+                            self.change_set.removed_elements.append(line_id)
                         else: 
                             self.msg(f'\n=> A malformed navigation line ("{line_id}") was found. Line will be ignored')
                         continue
 
-                    a_id = int(match.group(1))
-                    b_id = int(match.group(2))
+                    a_id = self.decode_id_number(match.group(1))
+                    b_id = self.decode_id_number(match.group(2))
 
                     # Remove line if either endpoint ID is missing
-                    if a_id not in points_by_intid or b_id not in points_by_intid:
+                    if a_id not in graph.points or b_id not in graph.points:
                         line.getparent().remove(line)
+                        self.change_set.removed_elements.append(line_id)
                         self.msg(f'\n=> An orphaned navigation line ("{line_id}") was found, line will be deleted.')
 
-        # --- Update Point-to-Point neighbor lists (using the stored DTOs) ---
-        for int_id, pinfo in list(points_by_intid.items()):
-            original_neighbors = list(pinfo.neighbours)
-            # keep only neighbors that exist in current document (keys are ints)
-            cleaned_neighbors = [n for n in original_neighbors if int(n) in points_by_intid]
-            if len(cleaned_neighbors) != len(original_neighbors):
-                # build and set new id using existing helper
-                new_id = self.build_point_id_attr(str(int_id), cleaned_neighbors)
-                pinfo.el.set('id', new_id)
-                # also update our DTO to reflect the change (so further ops use updated state)
-                pinfo.id = new_id
-                pinfo.neighbours = cleaned_neighbors # type: ignore
-                self.msg(f'\n=> Cleaned neignhbours for "{pinfo.id}", previous={original_neighbors} new={cleaned_neighbors}')
-                
-
-        # --- Update Building-to-Point entrance lists (using stored DTOs) ---
-        for int_b_id, binfo in list(buildings_by_intid.items()):
-            original_entrances = list(binfo.neighbours)
-            cleaned_entrances = [e for e in original_entrances if int(e) in points_by_intid]
+        # --- Update Point-to-Point neighbor lists (only the points referencing missing points, keeping the order of their ids) ---
+        for point_id in graph.dangling_points:
+            element = graph.point_element(point_id)
+            _, original_neighbors = self._extract_relations_from_point(element.get('id')) # type: ignore
+            cleaned_neighbors = [n for n in original_neighbors if n in graph.points]
+            new_id = self.build_point_id_attr(str(point_id), cleaned_neighbors)
+            self.set_element_id(element, new_id)
+            self.msg(f'\n=> Cleaned neignhbours for "{new_id}", previous={original_neighbors} new={cleaned_neighbors}')
+
+        # --- Update Building-to-Point entrance lists ---
+        for element, b_type, b_subtype, building_id, original_entrances in graph.buildings:
+            cleaned_entrances = [e for e in original_entrances if e in graph.points]
             if len(cleaned_entrances) != len(original_entrances):
-                # use the stored building type/subtype and helper to build the new id
                 new_building_id = self.build_building_id_attr(
-                    building_type=binfo.type,
-                    building_subtype=binfo.subtype,
-                    id=int(int_b_id),
+                    building_type=b_type,
+                    building_subtype=b_subtype,
+                    id=building_id,
                     entrance_ids=cleaned_entrances # type: ignore
                 )
-                binfo.el.set('id', new_building_id)
-                binfo.id = new_building_id
-                binfo.neighbours = cleaned_entrances # type: ignore
-                self.msg(f'\n=> Cleaned entrance point(s) for "{binfo.id}", previous={original_entrances} new={cleaned_entrances}')
+                self.set_element_id(element, new_building_id)
+                self.msg(f'\n=> Cleaned entrance point(s) for "{new_building_id}", previous={original_entrances} new={cleaned_entrances}')
+
+        # --- Stored geometry (point coordinates & line lengths) of the cleaned graph ---
+        self.update_navigation_metadata(self.collect_navigation_graph())
 
         self.msg('\n=> Clean DONE')
 
+    def collect_navigation_graph(self) -> 'FlutterMapExtension.NavigationGraph':
+        """
+        Collects the points, buildings and lines of the whole document in a single walk.
+        The point ids are parsed straight into flat arrays (point id numbers, (point, neighbour) links and the elements) 
+        and converted into the CSR arrays of a CompactGraph (see CompactGraph.from_links), no per point lists are kept.
+        """
+        from array import array
+        import numpy as np
+
+        point_ids, link_sources, link_targets = array('i'), array('i'), array('i')
+        point_elements: List[inkex.elements.BaseElement] = []
+        buildings, lines = [], []
+        for element in self.svg.xpath('//*[@id]'):
+            id_str = element.get('id')
+            point_id, neighbours = self._extract_relations_from_point(id_str)
+            if point_id is not None:
+                point_ids.append(point_id)
+                point_elements.append(element)
+                link_sources.extend(point_id for _ in neighbours)
+                link_targets.extend(neighbours)
+                continue
+            b_type, b_subtype, building_id, entrances = self.parse_building_id(id_str)
+            if building_id is not None:
+                buildings.append((element, b_type, b_subtype, building_id, entrances))
+                continue
+            line_match = self.NAV_LINE_ID_REGEX.match(id_str)
+            if line_match:
+                lines.append((element, self.decode_id_number(line_match.group(1)), self.decode_id_number(line_match.group(2))))
+
+        points = CompactGraph.from_links(point_ids, link_sources, link_targets, handles=point_elements)
+        missing_targets = ~np.isin(np.asarray(link_targets), np.asarray(points.node_ids))
+        dangling_points = np.unique(np.asarray(link_sources)[missing_targets]).tolist()
+        return self.NavigationGraph(points=points, buildings=buildings, lines=lines, dangling_points=dangling_points)
+
+    def write_compact_graph_ids(self, compact_graph: CompactGraph, indexes: Iterator[int]):
+        """ Writes the links of the given nodes of a CompactGraph (with the point elements as handles) back to the DOM as point ids """
+        for index in indexes:
+            self.set_element_id(compact_graph.handles[index], self.build_point_id_attr(compact_graph.node_ids[index], compact_graph.neighbour_ids(index))) # type: ignore
+
+    @staticmethod
+    def label_point_components(graph: 'FlutterMapExtension.NavigationGraph') -> Dict[int, int]:
+        """
+        Labels the connected components of the navigation graph with a traversal of its CompactGraph, O(V+E).
+        Returns a dict with the component label (component number) of every point. Links to missing points are ignored.
+        """
+        labels = graph.points.connected_components()
+        return dict(zip(graph.points.node_ids, labels))
+
+    def prune_points(self, prune_isolated: bool = True, prune_unreachable: bool = True):
+        """
+        Deletes the points that are no longer part of the navigation graph, together with their lines, in a single pass:
+            - isolated points: points without any (existing) neighbour
+            - unreachable points: connected groups of points that no building entrance belongs to
+
+        Entrance points are never deleted, and as whole components are deleted no remaining point references a deleted one.
+        """
+        graph = self.collect_navigation_graph()
+        components = self.label_point_components(graph)
+        entrances_ids = {entrance_id for *_, entrances in graph.buildings for entrance_id in entrances}
+
+        component_sizes: Dict[int, int] = {}
+        for label in components.values():
+            component_sizes[label] = component_sizes.get(label, 0) + 1
+
+        reachable_labels = {components[entrance_id] for entrance_id in entrances_ids if entrance_id in components}
+        if prune_unreachable and not reachable_labels:
+            self.msg('\n=> No building entrance found in the document, unreachable points will not be pruned')
+            prune_unreachable = False
+
+        # points to delete (a point is isolated when it is alone in its component)
+        pruned_points = set()
+        for point_id, label in components.items():
+            if point_id in entrances_ids:
+                continue
+            if component_sizes[label] == 1:
+                if prune_isolated:
+                    pruned_points.add(point_id)
+            elif prune_unreachable and label not in reachable_labels:
+                pruned_points.add(point_id)
+
+        # delete points & their lines
+        for point_id in sorted(pruned_points):
+            element = graph.point_element(point_id)
+            self.msg(f'\n=> Pruned point "{element.get("id")}" ({"isolated" if component_sizes[components[point_id]] == 1 else "unreachable"})')
+            self.change_set.removed_elements.append(element.get('id'))
+            self.remove_from_document_spatial_index(element)
+            element.delete()
+        for line, a_id, b_id in graph.lines:
+            if a_id in pruned_points or b_id in pruned_points:
+                self.change_set.removed_elements.append(line.get('id'))
+                line.delete()
+
+        self.msg(f'\n=> Prune DONE: {len(pruned_points)} points deleted')
+
+    @staticmethod
+    def cluster_coincident_points(coordinates: Dict[int, Tuple[float, float]], tolerance: float) -> List[List[int]]:
+        """
+        Groups the points closer than tolerance to each other (transitively) with a spatial hash: points are bucketed
+        on a grid of tolerance sized cells and only the 3x3 cells around each point are compared, near-linear time.
+        Returns the clusters with more than one point (point ids in ascending order).
+        """
+        cells: Dict[Tuple[int, int], List[int]] = {}
+        for point_id, (x, y) in coordinates.items():
+            cells.setdefault((math.floor(x / tolerance), math.floor(y / tolerance)), []).append(point_id)
+
+        close_points: Dict[int, List[int]] = {point_id: [] for point_id in coordinates}
+        for (cell_x, cell_y), cell_points in cells.items():
+            for other_cell in ((cell_x + dx, cell_y + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)):
+                for point_id in cell_points:
+                    for other_id in cells.get(other_cell, ()):
+                        if point_id < other_id and math.dist(coordinates[point_id], coordinates[other_id]) <= tolerance:
+                            close_points[point_id].append(other_id)
+
+        # clusters are the connected components of the "close to" graph
+        compact_graph = CompactGraph.from_adjacency(close_points)
+        clusters: Dict[int, List[int]] = {}
+        for index, label in enumerate(compact_graph.connected_components()):
+            clusters.setdefault(label, []).append(compact_graph.node_ids[index])
+        return [cluster for cluster in clusters.values() if len(cluster) > 1]
+
+    def merge_points(self, tolerance: str = '1px', copy_transform: str = 'no_copy'):
+        """
+        Merges the points stacked within tolerance of each other (e.g. after repeated connect runs or copy-paste) in a single pass:
+            - one point survives per cluster (an entrance if the cluster has any, then the lowest id) and takes the union of the neighbours
+            - entrances of different buildings are never merged into each other: each building keeps its own entrance point 
+              (and its flutter_maps:building_id), the rest of the cluster merges into the first one
+            - neighbour lists, building entrances and nav_lines pointing to a merged point are retargeted to the survivor
+            - lines that end up linking a point to itself or duplicating another line are deleted
+        Retargeted lines are redrawn (copy_transform has the same meaning as when connecting points) and the stored geometry is updated.
+        """
+        tolerance_value, tolerance_unit = self.extract_unit_from_text_expression(tolerance)
+        if not tolerance_value or not tolerance_unit:
+            raise inkex.AbortExtension(f'invalid units value provided for merge tolerance: "{tolerance}"')
+        max_dist = convert_unit(tolerance_value, tolerance_unit)
+
+        graph = self.collect_navigation_graph()
+        element_coordinates = self.resolve_navigation_coordinates(graph.points.handles) # type: ignore
+        coordinates = {point_id: element_coordinates[element] for point_id, element in zip(graph.points.node_ids, graph.points.handles)} # type: ignore
+        entrance_buildings: Dict[int, set] = {}
+        for *_, building_id, entrances in graph.buildings:
+            for entrance_id in entrances:
+                entrance_buildings.setdefault(entrance_id, set()).add(building_id)
+
+        survivor_of: Dict[int, int] = {}
+        for cluster in self.cluster_coincident_points(coordinates, max_dist):
+            # each round merges the entrances of a single building (plus, on the first round, the plain points) into one survivor
+            remaining = cluster
+            while len(remaining) > 1:
+                survivor = min(remaining, key=lambda point_id: (point_id not in entrance_buildings, point_id))
+                buildings = entrance_buildings.get(survivor)
+                merged = [point_id for point_id in remaining if point_id != survivor and entrance_buildings.get(point_id, buildings) == buildings]
+                remaining = [point_id for point_id in remaining if point_id != survivor and point_id not in merged]
+                if merged:
+                    survivor_of.update((point_id, survivor) for point_id in merged)
+                    self.msg(f'\n=> Merged points {[graph.point_element(point_id).get("id") for point_id in merged]} into "{graph.point_element(survivor).get("id")}"')
+                if remaining:
+                    self.msg(f'\n=> Entrances {[graph.point_element(point_id).get("id") for point_id in remaining]} belong to other buildings than '
+                             f'"{graph.point_element(survivor).get("id")}", they were not merged into it')
+        if not survivor_of:
+            self.msg('\n=> Merge DONE: no coincident points found')
+            return
+        resolve = lambda point_id: survivor_of.get(point_id, point_id)
+
+        # neighbour lists: survivors take the union of their cluster, everyone drops the merged ids. The links of the graph 
+        # are retargeted to the survivors as a whole and the point ids whose links changed are written back from the merged graph
+        import numpy as np
+        points = graph.points
+        resolved_ids = np.asarray(points.node_ids, dtype=np.int64)
+        for point_id, survivor in survivor_of.items():
+            resolved_ids[points.index_of(point_id)] = survivor
+        kept = (resolved_ids == np.asarray(points.node_ids)).nonzero()[0]
+        link_sources = np.repeat(resolved_ids, np.diff(np.asarray(points.offsets)))
+        link_targets = resolved_ids[np.asarray(points.targets)]
+        merged_graph = CompactGraph.from_links(resolved_ids[kept], link_sources, link_targets, handles=[points.handles[index] for index in kept.tolist()]) # type: ignore
+        self.write_compact_graph_ids(merged_graph, [index for index, point_id in enumerate(merged_graph.node_ids) 
+                                                    if merged_graph.neighbour_ids(index) != points.neighbour_ids(points.index_of(point_id))]) # type: ignore
+
+        # building entrances
+        for element, b_type, b_subtype, building_id, entrances in graph.buildings:
+            new_entrances = list(dict.fromkeys(resolve(entrance_id) for entrance_id in entrances))
+            if new_entrances != entrances:
+                self.set_element_id(element, self.build_building_id_attr(b_type, b_subtype, building_id, new_entrances))
+
+        # lines: the ones that keep their points win over retargeted duplicates
+        kept_edges = set()
+        retargeted_lines = []
+        for line, a_id, b_id in graph.lines:
+            a_id, b_id = self.get_line_point_ids(line, a_id, b_id)
+            if a_id in survivor_of or b_id in survivor_of:
+                retargeted_lines.append((line, resolve(a_id), resolve(b_id)))
+            else:
+                kept_edges.add((min(a_id, b_id), max(a_id, b_id)))
+        for line, a_id, b_id in retargeted_lines:
+            edge = (min(a_id, b_id), max(a_id, b_id))
+            if a_id == b_id or edge in kept_edges:
+                self.change_set.removed_elements.append(line.get('id'))
+                line.delete()
+                continue
+            kept_edges.add(edge)
+            a_element, b_element = graph.point_element(a_id), graph.point_element(b_id)
+            line.set('d', str(inkex.Path(self.build_connection_path_data(self.get_point_center(a_element), self.get_point_center(b_element),
+                                                                         a_element.transform, b_element.transform, copy_transform))))
+            self.invalidate_bounding_box(line)
+            line.set('flutter_maps:a_id', self.encode_id_number(a_id))
+            line.set('flutter_maps:b_id', self.encode_id_number(b_id))
+            self.set_element_id(line, self.build_nav_line_id(a_id, b_id))
+
+        for point_id in survivor_of:
+            element = graph.point_element(point_id)
+            self.change_set.removed_elements.append(element.get('id'))
+            self.remove_from_document_spatial_index(element)
+            element.delete()
+
+        self.update_navigation_metadata(self.collect_navigation_graph())
+        self.msg(f'\n=> Merge DONE: {len(survivor_of)} points merged, {len(retargeted_lines)} lines retargeted or deleted')
+
+    def refresh_lines(self, copy_transform: str = 'no_copy'):
+        """
+        Redraws every nav_line from the current position of its points (e.g. after moving points), in a single linear pass.
+        The points of each line are found through its flutter_maps:a_id / b_id attributes (falling back to the numbers of its id),
+        and each point center is resolved once. copy_transform has the same meaning as when connecting points.
+        Lines whose points do not exist are left untouched (see clean mode).
+        The stored point coordinates and line lengths are brought up to date as well.
+        """
+        graph = self.collect_navigation_graph()
+        centers: Dict[int, Tuple[float, float]] = {}
+
+        refreshed_lines = 0
+        for line, a_id, b_id in graph.lines:
+            a_id, b_id = self.get_line_point_ids(line, a_id, b_id)
+            if a_id not in graph.points or b_id not in graph.points:
+                self.msg(f'\n=> Line "{line.get("id")}" links a point that does not exist, it was not refreshed')
+                continue
+
+            for point_id in (a_id, b_id):
+                if point_id not in centers:
+                    centers[point_id] = self.get_point_center(graph.point_element(point_id))
+            # normalized the same way inkex writes the path data of new lines, so unchanged lines are detected
+            path_data = str(inkex.Path(self.build_connection_path_data(centers[a_id], centers[b_id], graph.point_element(a_id).transform, 
+                                                                       graph.point_element(b_id).transform, copy_transform)))
+            if line.get('d') == path_data:
+                continue
+            line.set('d', path_data)
+            self.invalidate_bounding_box(line)
+            self.change_set.updated_attributes.append((line.get('id'), 'd'))
+            refreshed_lines += 1
+
+        self.update_navigation_metadata(graph)
+        self.msg(f'\n=> Refresh DONE: {refreshed_lines} of {len(graph.lines)} lines redrawn')
+
+    CONNECTIVITY_LAYER_LABEL = 'connectivity_report'
+
+    def report_connectivity(self, color_components: bool = False):
+        """
+        Reports the connected components of the navigation graph (sizes, largest first) and every building whose entrance
+        is missing or is not part of the largest component. Components are labelled once (see label_point_components), O(V+E).
+        Each of those buildings is reported with the navigation point of the largest component nearest to it, looked up on an 
+        R-tree over the points of the largest component only (built once, on the first such building), O(log n) per building.
+
+        If color_components is set, every component is drawn with its own color on a temporary layer (replaced on each report)
+        """
+        graph = self.collect_navigation_graph()
+        components = self.label_point_components(graph)
+
+        points_by_component: Dict[int, List[int]] = {}
+        for point_id, label in components.items():
+            points_by_component.setdefault(label, []).append(point_id)
+        # largest first, ties broken by the lowest point id so the report is deterministic
+        ordered_components = sorted(points_by_component.values(), key=lambda point_ids: (-len(point_ids), min(point_ids)))
+        component_number = {components[point_ids[0]]: number for number, point_ids in enumerate(ordered_components, start=1)}
+
+        entrances_ids = {entrance_id for *_, entrances in graph.buildings for entrance_id in entrances}
+        self.msg(f'\n=> {len(graph.points)} points in {len(ordered_components)} components')
+        for number, point_ids in enumerate(ordered_components, start=1):
+            component_entrances = sum(1 for point_id in point_ids if point_id in entrances_ids)
+            self.msg(f'\n=> Component {number}: {len(point_ids)} points, {component_entrances} entrances')
+
+        unreachable_buildings = 0
+        largest_component_index = None
+        for element, b_type, b_subtype, building_id, entrances in graph.buildings:
+            existing_entrances = [entrance_id for entrance_id in entrances if entrance_id in components]
+            if not existing_entrances:
+                problem = 'has no entrance point'
+            elif any(component_number[components[entrance_id]] == 1 for entrance_id in existing_entrances):
+                continue
+            else:
+                problem = f'entrance is in component {min(component_number[components[entrance_id]] for entrance_id in existing_entrances)}'
+            unreachable_buildings += 1
+            if largest_component_index is None:
+                largest_component_index = self.build_component_points_index(graph, components, component_number, entrances_ids)
+            self.msg(f'\n=> Building "{element.get("id")}" (type: {b_type}, subtype: {b_subtype or "-"}) {problem}, not reachable from the largest component' + 
+                     self.describe_nearest_component_point(element, largest_component_index))
+        self.msg(f'\n=> Connectivity report DONE: {unreachable_buildings} of {len(graph.buildings)} buildings not reachable from the largest component')
+
+        if color_components:
+            self.draw_components_layer(graph, components, component_number)
+
+    def build_component_points_index(self, graph: 'FlutterMapExtension.NavigationGraph', components: Dict[int, int], 
+                                     component_number: Dict[int, int], entrances_ids: set) -> BoundingBoxRTree:
+        """ R-tree over the navigation points (entrances excluded) of the largest component, in document coordinates """
+        valid_elements = tuple(self.element_types_for_points())
+        return BoundingBoxRTree(
+            (self.get_spatial_index_box('point', element), element)
+            for point_id, element in zip(graph.points.node_ids, graph.points.handles) # type: ignore
+            if component_number[components[point_id]] == 1 and point_id not in entrances_ids and isinstance(element, valid_elements)
+        )
+
+    def describe_nearest_component_point(self, building: inkex.elements.BaseElement, component_points_index: BoundingBoxRTree) -> str:
+        """ Report suffix naming the point of component_points_index (see build_component_points_index) nearest to the building's bbox center """
+        bbox = self.get_bounding_box(building, document_coordinates=True)
+        if bbox is None:
+            return ''
+        for distance, element in component_points_index.nearest(bbox.center.x, bbox.center.y):
+            return f' (nearest point of the largest component: "{element.get("id")}", {distance:.2f} units from the building center)'
+        return ''
+
+    def draw_components_layer(self, graph: 'FlutterMapExtension.NavigationGraph', components: Dict[int, int], component_number: Dict[int, int]):
+        """ Draws every point & line of the graph on a temporary layer, colored by component (previous report layers are replaced) """
+        for old_layer in self.svg.xpath(f'//svg:g[@inkscape:groupmode="layer" and @inkscape:label="{self.CONNECTIVITY_LAYER_LABEL}"]'):
+            self.change_set.removed_elements.append(old_layer.get('id'))
+            old_layer.delete()
+
+        # evenly spread hues (golden angle), the largest component gets the first one
+        get_color = lambda label: str(inkex.Color(f'hsl({(component_number[label] - 1) * 137.508 % 360:.0f}, 80%, 45%)').to_rgb())
+
+        layer = inkex.Layer.new(self.CONNECTIVITY_LAYER_LABEL)
+        # shapes are drawn in document coordinates, as the layer has no transform
+        for line, a_id, b_id in graph.lines:
+            if a_id not in components or b_id not in components or components[a_id] != components[b_id]:
+                continue
+            a_center = self.get_bounding_box(graph.point_element(a_id), document_coordinates=True).center
+            b_center = self.get_bounding_box(graph.point_element(b_id), document_coordinates=True).center
+            path = inkex.PathElement.new(path=f'M {a_center.x} {a_center.y} L {b_center.x} {b_center.y}')
+            path.style['stroke'] = get_color(components[a_id])
+            path.style['stroke-width'] = self.svg.unittouu('1px')
+            layer.append(path)
+        for point_id, element in zip(graph.points.node_ids, graph.points.handles): # type: ignore
+            bbox = self.get_bounding_box(element, document_coordinates=True)
+            marker = polygons.Circle.new(center=(bbox.center.x, bbox.center.y), radius=max(bbox.width, bbox.height) * 0.75)
+            marker.style['fill'] = get_color(components[point_id])
+            marker.style['fill-opacity'] = '0.6'
+            marker.set('inkscape:label', f'component {component_number[components[point_id]]}')
+            layer.append(marker)
+
+        self.svg.append(layer)
+        self.change_set.created_layers.append(self.CONNECTIVITY_LAYER_LABEL)
+
     
+    def apply_id_encoding(self, id_encoding: 'FlutterMapExtension.IDEncoding' = IDEncoding.KEEP):
+        """
+        Sets the id numeric base to the one declared by the document. 
+        If a different encoding is requested, every point, building and line id (plus the ids stored as line / entrance metadata)
+        of the document is rewritten with the new base in a single pass and the new encoding is declared on the svg root.
+        """
+        declared_encoding = self.IDEncoding.get(self.svg.get(self.ID_ENCODING_ATTR) or self.IDEncoding.DECIMAL.value)
+        current_base = 36 if declared_encoding == self.IDEncoding.BASE36 else 10
+        self.set_id_base(current_base)
+
+        if id_encoding == self.IDEncoding.KEEP:
+            return
+        target_base = 36 if id_encoding == self.IDEncoding.BASE36 else 10
+        if target_base == current_base:
+            return
+
+        points, buildings, lines = self.rewrite_document_ids(target_base=target_base)
+        self.svg.set(self.ID_ENCODING_ATTR, id_encoding.value)
+        self.change_set.updated_attributes.append((self.svg.get('id'), self.ID_ENCODING_ATTR))
+        self.msg(f'\n=> Document ids re-encoded as {id_encoding.value}: {points} points, {buildings} buildings, {lines} lines')
+
+    def rewrite_document_ids(self, target_base: Optional[int] = None, renumber_points: bool = False, renumber_buildings: bool = False) -> Tuple[int, int, int]:
+        """
+        Rewrites every point, building and line id of the document (plus the ids stored as line / entrance metadata) in a single pass:
+            - target_base: id numbers are written with this base (current base if None)
+            - renumber_points / renumber_buildings: id numbers are compacted to 1..N, ordered by their current number. Every reference
+              (neighbours, entrances, line ids & metadata) goes through the same remap table, and elements sharing a number 
+              (e.g. the same stairs on different floors) keep sharing it.
+
+        Renumbering points requires every neighbour / entrance / line reference to point to an existing point (see clean mode),
+        as a dangling number could end up naming a different point.
+        Returns the number of (points, buildings, lines) rewritten.
+        """
+        # 1. parse everything with the current base
+        points, buildings, lines, entrances = [], [], [], []
+        for element in self.svg.xpath('//*[@id]'):
+            id_str = element.get('id')
+            point_id, neighbours = self._extract_relations_from_point(id_str)
+            if point_id is not None:
+                points.append((element, point_id, neighbours))
+                building_id = element.get('flutter_maps:building_id')
+                if building_id:
+                    entrances.append((element, self.decode_id_number(building_id)))
+                continue
+            b_type, b_subtype, building_id, entrance_ids = self.parse_building_id(id_str)
+            if building_id is not None:
+                buildings.append((element, b_type, b_subtype, building_id, entrance_ids))
+                continue
+            line_match = self.NAV_LINE_ID_REGEX.match(id_str)
+            if line_match:
+                lines.append((element, self.decode_id_number(line_match.group(1)), self.decode_id_number(line_match.group(2))))
+
+        # 2. remap tables (identity when not renumbering)
+        point_remap: Dict[int, int] = {}
+        if renumber_points:
+            point_remap = {old_id: new_id for new_id, old_id in enumerate(sorted({point_id for _, point_id, _ in points}), start=1)}
+            dangling_references = sorted(
+                {neighbour for _, _, neighbours in points for neighbour in neighbours if neighbour not in point_remap} |
+                {entrance for *_, entrance_ids in buildings for entrance in entrance_ids if entrance not in point_remap} |
+                {point_id for _, a_id, b_id in lines for point_id in (a_id, b_id) if point_id not in point_remap}
+            )
+            if dangling_references:
+                raise inkex.AbortExtension(f'Cannot renumber the points: the document references points that do not exist {dangling_references}. '
+                                           'Run the clean operation first')
+        building_remap: Dict[int, int] = {}
+        if renumber_buildings:
+            building_remap = {old_id: new_id for new_id, old_id in enumerate(sorted({b_id for _, _, _, b_id, _ in buildings}), start=1)}
+        new_point_id = lambda point_id: point_remap.get(point_id, point_id)
+        new_building_id = lambda building_id: building_remap.get(building_id, building_id)
+
+        # 3. write everything. Old ids are released first (attribute & document ids cache) as an old id may equal the new id of another element
+        old_ids = {}
+        for element, *_ in points + buildings + lines:
+            old_ids[element] = element.attrib.pop('id', None)
+            self.svg.ids.pop(old_ids[element], None)
+        if target_base is not None:
+            self.set_id_base(target_base)
+        for element, point_id, neighbours in points:
+            element.set('id', self.build_point_id_attr(new_point_id(point_id), [new_point_id(neighbour) for neighbour in neighbours]))
+        for element, building_id in entrances:
+            element.set('flutter_maps:building_id', self.encode_id_number(new_building_id(building_id)))
+            element.set('inkscape:label', f'building_point:{self.encode_id_number(new_building_id(building_id))}')
+        for element, b_type, b_subtype, building_id, entrance_ids in buildings:
+            element.set('id', self.build_building_id_attr(b_type, b_subtype, new_building_id(building_id), [new_point_id(entrance) for entrance in entrance_ids]))
+        for element, a_id, b_id in lines:
+            element.set('id', self.build_nav_line_id(new_point_id(a_id), new_point_id(b_id)))
+            element.set('flutter_maps:a_id', self.encode_id_number(new_point_id(a_id)))
+            element.set('flutter_maps:b_id', self.encode_id_number(new_point_id(b_id)))
+
+        self.change_set.renamed_ids.extend((old_id, element.get('id')) for element, old_id in old_ids.items() if old_id != element.get('id'))
+        self.change_set.updated_attributes.extend((element.get('id'), 'flutter_maps:building_id') for element, _ in entrances)
+        return len(points), len(buildings), len(lines)
+
     def _extract_relations_from_point(self, id_str: str ):
 
         p_id, p_neighbors = self.parse_point_id(id_str)
@@ -782,7 +1826,13 @@ class FlutterMapExtension(inkex.EffectExtension):
         The new id is guaranteed to be unique to prevent issues on the svg file.
         The id replacement might be one of: 
          - random: random string
+         - renumber: point & building id numbers of the whole document compacted to 1..N (selection is ignored, see rewrite_document_ids)
         """
+        if replacement_type == self.IDReplacementTypes.RENUMBER:
+            points, buildings, lines = self.rewrite_document_ids(renumber_points=clean_points, renumber_buildings=clean_buildings)
+            self.msg(f'\n=> Document ids renumbered: {points} points, {buildings} buildings, {lines} lines')
+            return
+
         # 1. Get all IDs currently in the document to avoid full DOM scans
         all_elements_by_id = self.svg.get_ids()
 
@@ -791,10 +1841,12 @@ class FlutterMapExtension(inkex.EffectExtension):
         buildings_by_intid: List[FlutterMapExtension.BuildingInfo] = []
 
 
-        selected_elements: selected.ElementList = self.svg.selected
+        scope_elements = self.get_scope_elements()
         # --- First pass: classify everything once and store parsed info ---
-        for element in selected_elements:
+        for element in scope_elements:
             id_str = element.get('id')
+            if not id_str:
+                continue
 
             if clean_points:
                 point_id, p_neighbors = self._extract_relations_from_point(id_str=id_str)
@@ -830,7 +1882,7 @@ class FlutterMapExtension(inkex.EffectExtension):
                 xml_element:inkex.elements.BaseElement = pointInfo.el
                 new_id = self.generate_random_id(isUniqueIdPredicate, prefix='p')
                 self.msg(f'\n=> Clean point element. Old id: {xml_element.get("id")}, new id: {new_id}')
-                xml_element.set('id',new_id)
+                self.set_element_id(xml_element, new_id)
                 xml_element.set('inkscape:label',new_id)
 
 
@@ -840,19 +1892,107 @@ class FlutterMapExtension(inkex.EffectExtension):
                 xml_element:inkex.elements.BaseElement = buildingInfo.el
                 new_id = self.generate_random_id(isUniqueIdPredicate, prefix='b')
                 self.msg(f'\n=> Clean building element. Old id: {xml_element.get("id")}, new id: {new_id}')
-                xml_element.set('id',new_id)
+                self.set_element_id(xml_element, new_id)
                 xml_element.set('inkscape:label',new_id)
     
     document_buildings = None
     unique_entrances_ids = None
+    bounding_boxes_cache = None
+    composed_transforms_cache = None
+    inverse_transforms_cache = None
+    document_spatial_index = None
+
+    def get_composed_transform(self, element: inkex.elements.BaseElement) -> inkex.Transform:
+        """
+        Run-scoped memoized element.composed_transform() (element coordinates to document coordinates).
+
+        Matrices are composed top-down from the nearest already resolved ancestor, so sibling elements 
+        share the work done for their common ancestors and every group matrix is composed once per run.
+        """
+        if self.composed_transforms_cache is None:
+            self.composed_transforms_cache = {}
+        cache = self.composed_transforms_cache
+
+        # walk up until an already resolved ancestor (or the top of the tree) is found
+        unresolved_chain = []
+        node = element
+        while node is not None and node not in cache:
+            unresolved_chain.append(node)
+            node = node.getparent()
+
+        transform = cache[node] if node is not None else inkex.Transform()
+        for node in reversed(unresolved_chain):
+            transform = transform @ node.transform
+            cache[node] = transform
+        return transform
+
+    def to_element_coordinates(self, element: inkex.elements.BaseElement, document_point) -> inkex.Vector2d:
+        """ 
+        Converts a point in document coordinates to the coordinates of element (e.g. the navigation layer),
+        the inverse matrix is computed once per element and run
+        """
+        if self.inverse_transforms_cache is None:
+            self.inverse_transforms_cache = {}
+        if element not in self.inverse_transforms_cache:
+            self.inverse_transforms_cache[element] = -self.get_composed_transform(element)
+        return self.inverse_transforms_cache[element].apply_to_point(document_point)
+
+    def get_bounding_box(self, element: inkex.elements.BaseElement, document_coordinates: bool = False) -> Optional[inkex.BoundingBox]:
+        """
+        Run-scoped memoized bounding box of an element, either in its parent coordinates (same as element.bounding_box())
+        or in document coordinates.
+
+        The extension never changes the transforms of groups / layers, so a cached box only becomes stale when the 
+        extension changes the element itself: invalidate_bounding_box must be called after changing its geometry or transform
+        (new elements, e.g. entrances, are created at their final position and need no invalidation).
+        """
+        if self.bounding_boxes_cache is None:
+            self.bounding_boxes_cache = {}
+
+        key = (element, document_coordinates)
+        if key not in self.bounding_boxes_cache:
+            if document_coordinates:
+                parent = element.getparent()
+                bbox = element.bounding_box(self.get_composed_transform(parent) if parent is not None else None)
+            else:
+                bbox = element.bounding_box()
+            self.bounding_boxes_cache[key] = bbox
+        return self.bounding_boxes_cache[key]
+
+    def get_point_position(self, element: inkex.elements.BaseElement, document_coordinates: bool = False) -> Tuple[float, float]:
+        """
+        Center of the bounding box of a point element, in its parent coordinates or in document coordinates.
+        For circles / ellipses it is their transformed cx / cy (the center of a symmetric shape is kept by affine transforms), 
+        which avoids building their shape path; other elements fall back to the memoized bounding box.
+        """
+        if isinstance(element, (polygons.Circle, polygons.Ellipse)):
+            transform = self.get_composed_transform(element) if document_coordinates else element.transform
+            center = transform.apply_to_point((float(element.get('cx') or 0), float(element.get('cy') or 0)))
+        else:
+            center = self.get_bounding_box(element, document_coordinates).center
+        return (center.x, center.y)
+
+    def invalidate_bounding_box(self, element: inkex.elements.BaseElement):
+        """ 
+        Drops the cached bounding boxes (and transforms) of an element whose geometry or transform was changed,
+        e.g. the nav_lines redrawn by the merge and refresh lines operations
+        """
+        if self.bounding_boxes_cache:
+            self.bounding_boxes_cache.pop((element, False), None)
+            self.bounding_boxes_cache.pop((element, True), None)
+        if self.composed_transforms_cache:
+            self.composed_transforms_cache.pop(element, None)
+        if self.inverse_transforms_cache:
+            self.inverse_transforms_cache.pop(element, None)
 
     def is_building_point(self, element) -> bool:
         """
-        Checks whether an element is a building (not points count as no element)
+        Checks whether an element is a building (not points count as no element, elements without id as well)
         """
         
         id_attr = element.get('id')
-        assert id_attr is not None, "Element has no ID attribute"
+        if id_attr is None:
+            return False
         
         point_id = self.get_point_id_number(id_attr)
         if point_id is None: 
@@ -865,16 +2005,18 @@ class FlutterMapExtension(inkex.EffectExtension):
         
         if self.unique_entrances_ids is None:
             # extract unique entrance IDs from document buildings (we asume each element matches the regex)
-            self.unique_entrances_ids = [self.BUILDING_ID_REGEX.match(e).group(4) for e in self.document_buildings] # pyright: ignore[reportOptionalMemberAccess]
+            self.unique_entrances_ids = {self.decode_id_number(self.BUILDING_ID_REGEX.match(e).group(4)) for e in self.document_buildings} # pyright: ignore[reportOptionalMemberAccess]
         
-        if str(point_id) in self.unique_entrances_ids:
+        if point_id in self.unique_entrances_ids:
             return True
 
         return False
 
 
     def smart_connect_nearest_point(self, points_to_connect: List[inkex.elements.BaseElement], 
-                                    ignore_building_point: bool = True, max_radius: str ="0.1px") -> List[List[inkex.elements.BaseElement]]:
+                                    ignore_building_point: bool = True, max_radius: str ="0.1px",
+                                    is_obstructed: Optional[Callable[[inkex.elements.BaseElement, inkex.elements.BaseElement], bool]] = None,
+                                    ) -> List[List[inkex.elements.BaseElement]]:
         """ 
         Builds and returns a list of pairs of PointsInfo, each pair indicates a connection that will be made. 
         This method only returns the pairs of points to connect, connect is not performed by this function. 
@@ -883,7 +2025,10 @@ class FlutterMapExtension(inkex.EffectExtension):
 
         receives a list of elements filtered by ellipses / circles 
         allows to specify whether to connect to building points 
-        requires a max search radius
+        requires a max search radius (distances are measured between the point centers in document coordinates)
+        optionally receives an obstruction test, candidates whose connection is obstructed are skipped in favour of the next nearest one
+
+        Candidates are looked up on the document spatial index shared by the run (see get_document_spatial_index)
         """
         # validate inputs 
         max_radius_value, max_radius_unit = FlutterMapExtension.extract_unit_from_text_expression(max_radius)
@@ -891,12 +2036,6 @@ class FlutterMapExtension(inkex.EffectExtension):
         from inkex.units import convert_unit
         max_dist = convert_unit(max_radius_value, max_radius_unit)
 
-        # lambda used to calculate euclidean distance between the points center
-        calculate_distance_between_elements = lambda el1, el2: math.sqrt(
-            (el1.bounding_box().x.center - el2.bounding_box().x.center)**2 + 
-            (el1.bounding_box().y.center - el2.bounding_box().y.center)**2
-        )
-
         sequences_of_points_to_connect: List[List[inkex.elements.BaseElement]] = []
 
         # exclude the points linked to buildings from the points available to connect
@@ -904,19 +2043,27 @@ class FlutterMapExtension(inkex.EffectExtension):
             [ p for p in points_to_connect if not self.is_building_point(p)] if ignore_building_point \
             else points_to_connect
 
+        # document spatial index, the elements that are not navigation points yet (plain ellipses / circles when points 
+        # are not filtered) are indexed as points as they are about to become ones
+        spatial_index = self.get_document_spatial_index()
+        for candidate_point in available_points_to_connect:
+            if self.get_point_id_number(candidate_point.get('id') or '') is None:
+                self.add_to_document_spatial_index('point', candidate_point)
+        available_points = set(available_points_to_connect)
+
         # Iterate over each point to connect and add it to the list of pairs to connect along with the nearest point (if any)
         for point in (points_to_connect):
             nearest_point = None
-            minimum_distance = max_dist
-
-            # find the nearest point
-            for candidate_point in available_points_to_connect:
-                if point.get('id') == candidate_point.get('id'): continue
-                
-                dist = calculate_distance_between_elements(point, candidate_point)
-                if dist < minimum_distance:
-                    minimum_distance = dist
+            x, y = self.get_point_position(point, document_coordinates=True)
+
+            # candidates come nearest first (ties in document order), only the obstruction of the nearest ones is tested until one is reachable
+            for dist, (_, candidate_point) in spatial_index.nearest(x, y, max_dist):
+                if dist >= max_dist:
+                    break
+                if candidate_point is point or candidate_point not in available_points: continue
+                if is_obstructed is None or not is_obstructed(point, candidate_point):
                     nearest_point = candidate_point
+                    break
             
             if nearest_point is not None:
                 # if we got a nearest node then we add that pair to list
@@ -924,191 +2071,593 @@ class FlutterMapExtension(inkex.EffectExtension):
         
         return sequences_of_points_to_connect
 
-    def filter_non_valid_points(self, elements: selected.ElementList, valid_element_classes: tuple, filter_non_points:bool = True) -> selected.ElementList:
-        # Firstly filter by class
-        filtered_elements = elements.filter(valid_element_classes)
-        
-        # Filter element which id does not match point definitions
-        matched_ids = [el.eid for el in filtered_elements if FlutterMapExtension.is_element_a_point(el.eid)] if filter_non_points else [el.eid for el in filtered_elements]
+    @staticmethod
+    def _axis_cone_test(x: float, y: float, axis: int, step: int, max_slope: float) -> Callable[[float, float, float, float], bool]:
+        """ 
+        Box test for the cone of a direction starting at (x, y): whether any point of the box is ahead along the axis (step +1 / -1) 
+        and no further across it than max_slope times that distance (farthest position along vs nearest position across)
+        """
+        if axis == 0:
+            if step > 0:
+                return lambda min_x, min_y, max_x, max_y: max_x > x and max(min_y - y, 0.0, y - max_y) <= (max_x - x) * max_slope
+            return lambda min_x, min_y, max_x, max_y: min_x < x and max(min_y - y, 0.0, y - max_y) <= (x - min_x) * max_slope
+        if step > 0:
+            return lambda min_x, min_y, max_x, max_y: max_y > y and max(min_x - x, 0.0, x - max_x) <= (max_y - y) * max_slope
+        return lambda min_x, min_y, max_x, max_y: min_y < y and max(min_x - x, 0.0, x - max_x) <= (y - min_y) * max_slope
+
+    def smart_connect_axis_aligned(self, points_to_connect: List[inkex.elements.BaseElement],
+                                   ignore_building_point: bool = True, max_radius: str = "0.1px", axis_tolerance: float = 15.0,
+                                   is_obstructed: Optional[Callable[[inkex.elements.BaseElement, inkex.elements.BaseElement], bool]] = None,
+                                   ) -> List[List[inkex.elements.BaseElement]]:
+        """
+        Builds and returns a list of pairs of points, connecting each point to its nearest point on each cardinal direction
+        (right, left, down, up). A candidate is on a direction when the angle between them and the axis is at most axis_tolerance degrees.
 
-        # Create a clean, empty ElementList instance linked to the current SVG
-        result_list = inkex.elements._selected.ElementList(self.svg)
-        
-        # Populate it using the built-in .set() method
-        result_list.set(*matched_ids)
+        Output might contain duplicated connections (A to B and B to A)
+
+        Centers are computed once and indexed on an R-tree of the points that can be connected to. Each direction is then resolved 
+        with a nearest query that only visits the tree nodes overlapping its cone: candidates come nearest first, so the scan stops at 
+        the first candidate inside the cone whose connection is not obstructed, and directions without any candidate are discarded
+        after visiting a few nodes. A query costs O(log n) on corridor layouts, so the whole connection is O(n log n); it only degrades 
+        (towards the points within max_radius) when many nodes overlap the cone without holding a point inside it, or when many 
+        candidates in a row are obstructed.
+        """
+        # validate inputs
+        max_radius_value, max_radius_unit = FlutterMapExtension.extract_unit_from_text_expression(max_radius)
+        assert max_radius_unit and max_radius_value, f'Invalid max radio string repreesentation: {max_radius}'
+        max_dist = convert_unit(max_radius_value, max_radius_unit)
+        assert 0 <= axis_tolerance < 90, f'Invalid axis tolerance: {axis_tolerance}. Must be in range [0, 90) degrees'
+        max_slope = math.tan(math.radians(axis_tolerance))
+
+        # cached centers (document coordinates, same space as the obstruction test) & whether each point can be connected to 
+        # (building points are only connected from)
+        centers = [self.get_point_position(element, document_coordinates=True) for element in points_to_connect]
+        is_target = [not (ignore_building_point and self.is_building_point(p)) for p in points_to_connect]
+        targets_index = BoundingBoxRTree(((x, y, x, y), index) for index, (x, y) in enumerate(centers) if is_target[index])
+
+        sequences_of_points_to_connect: List[List[inkex.elements.BaseElement]] = []
+
+        for axis in (0, 1):
+            other_axis = 1 - axis
+            for point_index in range(len(centers)):
+                origin = centers[point_index]
+                # step +1 looks towards the positive direction of the axis (right / down) and -1 towards the negative one
+                for step in (1, -1):
+                    nearest_index = None
+                    overlaps_cone = self._axis_cone_test(origin[0], origin[1], axis, step, max_slope)
+                    for dist, candidate_index in targets_index.nearest(origin[0], origin[1], max_dist, within=overlaps_cone):
+                        if dist >= max_dist:
+                            break
+                        along = (centers[candidate_index][axis] - origin[axis]) * step
+                        if along <= 0:
+                            continue
+                        across = abs(centers[candidate_index][other_axis] - origin[other_axis])
+                        if across > along * max_slope:
+                            continue
+                        # obstruction test is only made for the nearest candidates of the cone until one is reachable
+                        if is_obstructed is not None and is_obstructed(points_to_connect[point_index], points_to_connect[candidate_index]):
+                            continue
+                        nearest_index = candidate_index
+                        break
+
+                    if nearest_index is not None:
+                        sequences_of_points_to_connect.append([points_to_connect[point_index], points_to_connect[nearest_index]])
+
+        return sequences_of_points_to_connect
+
+    # Shapes whose outline can be used as obstacle, any other element (groups, images, text...) falls back to its bounding box
+    OBSTACLE_ELEMENT_TYPES = (polygons.PathElement, polygons.Rectangle, polygons.Polygon, polygons.Polyline,
+                              polygons.Line, polygons.Circle, polygons.Ellipse)
+    # Max distance between a curve and the polyline used to approximate it
+    OBSTACLE_FLATNESS = 0.1
+
+    def smart_connect_visibility_graph(self, points_to_connect: List[inkex.elements.BaseElement],
+                                       ignore_building_point: bool = True, max_radius: str = "",
+                                       is_obstructed: Optional[Callable[[inkex.elements.BaseElement, inkex.elements.BaseElement], bool]] = None,
+                                       ) -> List[List[inkex.elements.BaseElement]]:
+        """
+        Builds and returns the pairs of points of the visibility graph: every pair of points (closer than max_radius, if given) whose 
+        straight connection is not obstructed (see build_obstruction_test). Two building points are never paired if ignore_building_point is set.
+
+        Each pair is produced once (A to B only). Broad phase: R-tree over the point centers (document coordinates, the space of the 
+        obstruction test), each point is only paired with the points of higher index found in its max_radius box (all of them without 
+        max_radius, O(n^2) pairs). Narrow phase: the obstruction test, itself indexed by an R-tree over the obstacles.
+        """
+        # validate inputs (an empty radius means no limit)
+        max_dist = math.inf
+        if max_radius:
+            max_radius_value, max_radius_unit = FlutterMapExtension.extract_unit_from_text_expression(max_radius)
+            if not max_radius_unit or not max_radius_value:
+                raise inkex.AbortExtension(f'invalid units value provided for visibility max radius: "{max_radius}"')
+            max_dist = convert_unit(max_radius_value, max_radius_unit)
+
+        centers = [self.get_point_position(element, document_coordinates=True) for element in points_to_connect]
+        is_target = [not (ignore_building_point and self.is_building_point(p)) for p in points_to_connect]
+        centers_index = BoundingBoxRTree(((x, y, x, y), index) for index, (x, y) in enumerate(centers))
+
+        sequences_of_points_to_connect: List[List[inkex.elements.BaseElement]] = []
+        for index, (x, y) in enumerate(centers):
+            for other_index in sorted(centers_index.query(x - max_dist, y - max_dist, x + max_dist, y + max_dist)):
+                if other_index <= index or not (is_target[index] or is_target[other_index]):
+                    continue
+                if math.dist(centers[index], centers[other_index]) >= max_dist:
+                    continue
+                point, other_point = points_to_connect[index], points_to_connect[other_index]
+                if is_obstructed is None or not is_obstructed(point, other_point):
+                    sequences_of_points_to_connect.append([point, other_point])
+
+        return sequences_of_points_to_connect
+
+    def get_obstacle_outline(self, element: inkex.elements.BaseElement) -> List[List[Tuple[float, float]]]:
+        """
+        Returns the outline of an element as a list of polylines (one per sub-path) in document coordinates.
+        Curves are flattened, elements without a path are approximated by their bounding box.
+        """
+        if isinstance(element, self.OBSTACLE_ELEMENT_TYPES):
+            from inkex import bezier
+            path = element.path.to_absolute().transform(self.get_composed_transform(element))
+            csp = path.to_superpath()
+            bezier.cspsubdiv(csp, self.OBSTACLE_FLATNESS)
+            return [[(node[1][0], node[1][1]) for node in sub_path] for sub_path in csp if sub_path]
+
+        bbox = self.get_bounding_box(element, document_coordinates=True)
+        if bbox is None:
+            return []
+        return [[(bbox.left, bbox.top), (bbox.right, bbox.top), (bbox.right, bbox.bottom), (bbox.left, bbox.bottom)]]
+
+    def collect_obstacles(self, walls_layer: str = '') -> List['FlutterMapExtension.ObstacleInfo']:
+        """
+        Collects the outlines that navigation lines are not allowed to cross:
+         - every element whose id matches the building pattern (closed outline, its interior blocks too)
+         - every shape inside the layer labeled as walls_layer, if any (only its strokes block)
+        """
+        obstacles: List[FlutterMapExtension.ObstacleInfo] = []
+
+        # single document walk instead of a getElementById lookup per building id
+        for element in self.svg.xpath('//*[@id]'):
+            building_id, entrances, _, _ = self._extract_relations_from_building(id_str=element.get('id'))
+            if building_id is None:
+                continue
+            rings = self.get_obstacle_outline(element)
+            if rings:
+                obstacles.append(self.ObstacleInfo(el=element, rings=rings, closed=True, entrance_ids=entrances))
+
+        if walls_layer:
+            query = f'//svg:g[@inkscape:groupmode="layer" and @inkscape:label="{walls_layer}"]'
+            for layer in self.svg.xpath(query):
+                for element in layer.descendants().filter(*self.OBSTACLE_ELEMENT_TYPES):
+                    rings = self.get_obstacle_outline(element)
+                    if rings:
+                        obstacles.append(self.ObstacleInfo(el=element, rings=rings, closed=False, entrance_ids=[]))
+
+        return obstacles
+
+    @staticmethod
+    def _segments_cross(a, b, c, d) -> bool:
+        """ Whether segment a-b properly crosses segment c-d (touching or collinear segments do not count) """
+        def orientation(p, q, r):
+            return (q[0] - p[0]) * (r[1] - p[1]) - (q[1] - p[1]) * (r[0] - p[0])
+
+        return orientation(c, d, a) * orientation(c, d, b) < 0 and orientation(a, b, c) * orientation(a, b, d) < 0
+
+    @staticmethod
+    def _point_in_ring(point, ring) -> bool:
+        """ Even-odd ray casting test of a point against a polygon ring """
+        x, y = point
+        inside = False
+        previous_x, previous_y = ring[-1]
+        for current_x, current_y in ring:
+            if (current_y > y) != (previous_y > y):
+                intersection_x = current_x + (y - current_y) * (previous_x - current_x) / (previous_y - current_y)
+                if x < intersection_x:
+                    inside = not inside
+            previous_x, previous_y = current_x, current_y
+        return inside
+
+    @classmethod
+    def segment_crosses_obstacle(cls, start, end, obstacle: 'FlutterMapExtension.ObstacleInfo') -> bool:
+        """ Exact test of the segment start-end against every edge of the obstacle outline """
+        seg_min_x, seg_max_x = min(start[0], end[0]), max(start[0], end[0])
+        seg_min_y, seg_max_y = min(start[1], end[1]), max(start[1], end[1])
+
+        for ring in obstacle.rings:
+            edges = zip(ring, ring[1:] + ring[:1]) if obstacle.closed else zip(ring, ring[1:])
+            for c, d in edges:
+                # cheap reject of the edges that are far from the segment
+                if (c[0] < seg_min_x and d[0] < seg_min_x) or (c[0] > seg_max_x and d[0] > seg_max_x) or \
+                   (c[1] < seg_min_y and d[1] < seg_min_y) or (c[1] > seg_max_y and d[1] > seg_max_y):
+                    continue
+                if cls._segments_cross(start, end, c, d):
+                    return True
+
+        # a segment can go through a building touching its outline only at vertices, or lie fully inside it
+        if obstacle.closed:
+            middle = ((start[0] + end[0]) / 2, (start[1] + end[1]) / 2)
+            if sum(cls._point_in_ring(middle, ring) for ring in obstacle.rings if len(ring) > 2) % 2 == 1:
+                return True
+
+        return False
+
+    def build_obstruction_test(self, walls_layer: str = '') -> Optional[Callable[[inkex.elements.BaseElement, inkex.elements.BaseElement], bool]]:
+        """
+        Returns a function telling whether the straight connection between two point elements crosses
+        a building outline or a wall (None when the document has no obstacles at all).
 
-        return result_list
+        Broad phase: R-tree over the obstacles bounding boxes, queried with each segment bounding box.
+        Narrow phase: exact segment / outline test against the candidates only.
+        A building is never an obstacle for the connections of its own entrance points.
+        """
+        obstacles = self.collect_obstacles(walls_layer)
+        if not obstacles:
+            return None
+
+        obstacles_index = BoundingBoxRTree(
+            ((min(x for ring in o.rings for x, _ in ring), min(y for ring in o.rings for _, y in ring),
+              max(x for ring in o.rings for x, _ in ring), max(y for ring in o.rings for _, y in ring)), o)
+            for o in obstacles
+        )
+
+        # point centers in document coordinates (same space as the obstacles outlines), computed once per element
+        centers: Dict[inkex.elements.BaseElement, Tuple[float, float]] = {}
+        def get_center(element):
+            if element not in centers:
+                centers[element] = self.get_point_position(element, document_coordinates=True)
+            return centers[element]
+
+        def is_obstructed(point_a, point_b) -> bool:
+            start, end = get_center(point_a), get_center(point_b)
+            pair_point_ids = {self.get_point_id_number(point_a.get('id') or ''), self.get_point_id_number(point_b.get('id') or '')}
+
+            candidates = obstacles_index.query(min(start[0], end[0]), min(start[1], end[1]), max(start[0], end[0]), max(start[1], end[1]))
+            return any(
+                self.segment_crosses_obstacle(start, end, obstacle)
+                for obstacle in candidates
+                if pair_point_ids.isdisjoint(obstacle.entrance_ids)
+            )
+
+        return is_obstructed
 
-    def smart_connect_points(self, smart_connect_type: SmartConnectTypes, connection_options: PointConnectionOptions = PointConnectionOptions(), filter_non_points: bool = True ,**connection_params):
-        """ Smart connect points using specified algorithm """
+    def filter_non_valid_points(self, elements: List[inkex.BaseElement], valid_element_classes: tuple, filter_non_points:bool = True) -> List[inkex.BaseElement]:
+        # Filter by class (a no-op for the scope elements, already filtered while walking) keeping the given order
+        filtered_elements = [el for el in elements if isinstance(el, valid_element_classes)]
+        
+        # Filter element which id does not match point definitions
+        # (read only: elements found walking a layer may have no id, they are given one when they are connected)
+        if filter_non_points:
+            return [el for el in filtered_elements if FlutterMapExtension.is_element_a_point(el.get('id') or '')]
+        return filtered_elements
+
+    def smart_connect_points(self, smart_connect_type: SmartConnectTypes, connection_options: PointConnectionOptions = PointConnectionOptions(), filter_non_points: bool = True,
+                             avoid_obstacles: bool = False, walls_layer: str = '', axis_tolerance: float = 15.0, visibility_max_radius: str = '',
+                             **connection_params):
+        """ 
+        Smart connect points using specified algorithm 
+        (the visibility graph uses its own visibility_max_radius instead of the max_radius of the connection params)
+
+        If avoid_obstacles is set, connections crossing a building outline or a shape of the walls layer are never made
+        (the visibility graph always avoids them)
+        """
         # Validate and filter inputs: At least two ellipses / circles to connect
-        selected_elements: selected.ElementList = self.svg.selected
-        if not selected_elements or len(selected_elements) <= 0:
+        if self.operation_scope == self.OperationScope.SELECTION and not self.svg.selected:
             raise inkex.AbortExtension("No selection: Need to select at least 2 objects")
 
-        # NOTE: selected_elements holds the elements in the user selection order
+        # NOTE: scope elements hold the elements in the user selection order (document order for layer scopes)
         valid_elements = tuple(self.element_types_for_points())
 
-        selected_ellipses: List = list( self.filter_non_valid_points(selected_elements, valid_elements, filter_non_points) )
+        selected_ellipses: List = self.filter_non_valid_points(self.get_scope_elements(valid_elements), valid_elements, filter_non_points)
             
 
         if len(selected_ellipses) < 2:
-            raise inkex.AbortExtension( f"Not enough ellipses selected. Need at least 2, got {len(selected_ellipses)}.")
+            raise inkex.AbortExtension( f"Not enough ellipses in the {self.describe_scope()}. Need at least 2, got {len(selected_ellipses)}.")
 
         # List that contains the svg elements that will be connected
         # each algorithm will result in a differents set of pairs of points to connect
         raw_pairs_of_points_to_connect : List[List[inkex.elements.BaseElement]]
+        is_obstructed = self.build_obstruction_test(walls_layer) if avoid_obstacles or smart_connect_type == self.SmartConnectTypes.VISIBILITY_GRAPH else None
         if smart_connect_type == self.SmartConnectTypes.NEAREST_POINT:
             # Will connect each point to the nearest point
-            raw_pairs_of_points_to_connect = self.smart_connect_nearest_point(points_to_connect=selected_ellipses, **connection_params)
+            raw_pairs_of_points_to_connect = self.smart_connect_nearest_point(points_to_connect=selected_ellipses, is_obstructed=is_obstructed, **connection_params)
+        elif smart_connect_type == self.SmartConnectTypes.AXIS_ALIGNED:
+            # Will connect each point to the nearest point on each cardinal direction
+            raw_pairs_of_points_to_connect = self.smart_connect_axis_aligned(points_to_connect=selected_ellipses, axis_tolerance=axis_tolerance,
+                                                                             is_obstructed=is_obstructed, **connection_params)
+        elif smart_connect_type == self.SmartConnectTypes.VISIBILITY_GRAPH:
+            # Will connect every pair of points that see each other
+            raw_pairs_of_points_to_connect = self.smart_connect_visibility_graph(points_to_connect=selected_ellipses, is_obstructed=is_obstructed, 
+                                                                                 **{**connection_params, 'max_radius': visibility_max_radius})
         else:
             raise NotImplementedError(f'Smart connect type not implemented: {smart_connect_type}')
         
 
-        # Input Normalization: extract and group required information for connection operation, 
-        # find max existing model point id across the whole document to assign new IDs
-        max_id_number = self.get_max_existing_object_id(self.svg.get_ids(), self.get_point_id_number)
+        # Finally connect the points based on the pair of points determined by the algorithm
+        self.connect_element_pairs(pairs_of_elements=raw_pairs_of_points_to_connect, connection_options=connection_options)
 
-        # List that will be used to call the sequential point connection function 
-        pairs_of_points_to_connect: List[List[FlutterMapExtension.PointInfo]] = []
-        current_pair = 0
-        # Convert the pair of svg elements to pairs of PointInfo objects
-        for pair_list in raw_pairs_of_points_to_connect: 
-            pairs_of_points_to_connect.append([])
-            for element in pair_list:
-                id_attr = element.get('id')
+    def connect_element_pairs(self, pairs_of_elements: List[List[inkex.elements.BaseElement]], connection_options: PointConnectionOptions):
+        """
+        Connects pairs of svg elements. Each element is normalized once into a single PointInfo 
+        (assigning a new model point id if it has none) so that its neighbours accumulate across all the pairs, 
+        then the whole edge set is committed at once.
+        """
+        # Input Normalization: find max existing model point id across the whole document to assign new IDs
+        max_id_number = self.get_max_existing_object_id(self.svg.get_ids(), self.get_point_id_number)
 
+        points_info: Dict[inkex.elements.BaseElement, FlutterMapExtension.PointInfo] = {}
+        pairs_of_points_to_connect: List[Tuple[FlutterMapExtension.PointInfo, FlutterMapExtension.PointInfo]] = []
+        for element_a, element_b in pairs_of_elements:
+            for element in (element_a, element_b):
+                if element in points_info:
+                    continue
                 # attempt to extract an already assigned model point id
-                element_id, neighbors = self.parse_point_id(id_attr)
+                element_id, neighbors = self.parse_point_id(element.get('id'))
 
                 # Assign a new model point id if not already present
                 if element_id is None:
                     max_id_number = self.get_next_object_id(max_id_number)
                     element_id = max_id_number 
+                points_info[element] = self.PointInfo(el= element, id= str(element_id), neighbours= neighbors)
 
-                pairs_of_points_to_connect[current_pair].append(self.PointInfo(el= element, id= str(element_id), neighbours= neighbors))
-            current_pair += 1
-
-        # Finally connect the points based on the pair of points determined by the algorithm
-        for pair_of_points_to_connect in pairs_of_points_to_connect: 
-            # update neighbours in case the id got modified in other entry (recalculate based on id)
-            pair_of_points_to_connect[0].neighbours = (self.parse_point_id(pair_of_points_to_connect[0].el.get('id')))[1]
-            pair_of_points_to_connect[1].neighbours = (self.parse_point_id(pair_of_points_to_connect[1].el.get('id')))[1]
-            self.connect_using_point_info(elements_info=pair_of_points_to_connect, connection_options=connection_options)
+            pairs_of_points_to_connect.append((points_info[element_a], points_info[element_b]))
 
+        self.commit_point_connections(pairs_of_points=pairs_of_points_to_connect, connection_options=connection_options)
 
     @staticmethod
-    def add_neighbour(element_info: Union[PointInfo, BuildingInfo], neighbour_id: str):  
+    def add_neighbour(element_info: Union[PointInfo, BuildingInfo], neighbour_id: Union[str, int]) -> bool:  
         """ 
         helper to add point neighbours to a existing navigation-point or building (no duplicates, not the same point as neighbour)
         Takes an point info elements modifies the state of its contained element to add a new point neighbour
+
+        Neighbours are stored as int, returns whether the neighbour was added
         """
-        if neighbour_id == element_info.id:
-            return
-        if neighbour_id not in element_info.neighbours:
-            element_info.neighbours.append(neighbour_id) # type: ignore
+        neighbour_id = int(neighbour_id)
+        if neighbour_id == int(element_info.id) or neighbour_id in element_info.neighbours:
+            return False
+        element_info.neighbours.append(neighbour_id)
+        return True
+
+    def describe_scope(self) -> str:
+        """ Human readable name of the operation scope, used on the messages """
+        if self.operation_scope == self.OperationScope.SELECTION:
+            return 'selection'
+        if self.operation_scope == self.OperationScope.CURRENT_LAYER:
+            return 'current layer'
+        if self.operation_scope == self.OperationScope.NAMED_LAYER:
+            return f'layer "{self.scope_layer}"'
+        return 'document'
+
+    def get_scope_elements(self, element_types: Optional[Tuple[Type[inkex.BaseElement], ...]] = None, top_level_only: bool = False,
+                           excluded_layers: Collection[str] = ()) -> List[inkex.BaseElement]:
+        """
+        Returns the elements an operation works on according to the operation scope:
+            - selection: the selected elements, in selection order
+            - current layer / named layer / document: the shapes of the layer (or document) subtree in document order, walked 
+              directly so no GUI selection is needed (definitions and metadata are never entered)
+        Only instances of element_types are kept (e.g. element_types_for_points), checked while walking. With top_level_only 
+        the walk stops at the objects of each layer (sublayers are entered, groups are not), as "Select All" in each layer would.
+        Sublayers labeled as one of excluded_layers (e.g. the navigation layer) are skipped along with their whole subtree.
+        """
+        if self.operation_scope == self.OperationScope.SELECTION:
+            return [element for element in self.svg.selected if not element_types or isinstance(element, element_types)]
+
+        if self.operation_scope == self.OperationScope.CURRENT_LAYER:
+            roots = [self.svg.get_current_layer()]
+        elif self.operation_scope == self.OperationScope.NAMED_LAYER:
+            query = f'//svg:g[@inkscape:groupmode="layer" and @inkscape:label="{self.scope_layer}"]'
+            roots = self.svg.xpath(query)
+            if not roots:
+                raise inkex.AbortExtension(f'No layer labeled "{self.scope_layer}" found in the document')
+        else:
+            roots = [self.svg]
+
+        scope_elements = []
+        for root in roots:
+            # explicit stack (children pushed reversed) keeps document order without recursion on deep trees
+            pending = [child for child in reversed(root) if isinstance(child, inkex.ShapeElement)]
+            while pending:
+                element = pending.pop()
+                is_layer = isinstance(element, inkex.Layer)
+                if is_layer and element.get('inkscape:label') in excluded_layers:
+                    continue
+                if not is_layer and (not element_types or isinstance(element, element_types)):
+                    scope_elements.append(element)
+                if top_level_only and not is_layer:
+                    continue
+                pending.extend(child for child in reversed(element) if isinstance(child, inkex.ShapeElement))
 
-    def connect_using_point_info(self, elements_info: List[PointInfo], connection_options: PointConnectionOptions): 
+        return scope_elements
+
+    def get_navigation_layer(self) -> inkex.Layer:
+        """ 
+        Returns the "navigation" layer of the document (created if it does not exist yet),
+        moved to the very bottom of the XML tree (top Z-index).
         """
-        Takes a List with PointInfo as elements, iterates over them and connects them in sequential order. 
-        Connection / Link is store in both elements id attribute
+        query = '//svg:g[@inkscape:groupmode="layer" and @inkscape:label="navigation"]'
+        layers_search_result = self.svg.xpath(query)
 
-        If the list has [A, B], then connects (A to B & B to A) 
-        If the list has [A, B, C], then connects (A to B, B to A) & (B to C, C to B)
+        if layers_search_result:
+            points_layer = layers_search_result[0]
+        else:
+            points_layer = inkex.Layer.new("navigation")
+            self.svg.add(points_layer)
+            self.change_set.created_layers.append("navigation")
+
+        # Even if it already existed elsewhere, this moves it to the end.
+        self.svg.append(points_layer)
+        return points_layer
+
+    def get_point_center(self, element: inkex.elements.BaseElement) -> Tuple[float, float]:
+        """ Center of a point element in its own coordinates: read from cx/cy, fallback to bounding box calculation """
+        return (
+            float(cx if (cx := element.get('cx')) else self.get_bounding_box(element).center.x),
+            float(cy if (cy := element.get('cy')) else self.get_bounding_box(element).center.y)
+        )
 
-        This strategy is done until there are no more elements to process. 
+    def resolve_navigation_coordinates(self, elements: List[inkex.elements.BaseElement]) -> Dict[inkex.elements.BaseElement, Tuple[float, float]]:
+        """
+        Centers of point elements resolved (walking all their transforms) to the navigation layer coordinates, 
+        or to document coordinates if the document has no navigation layer yet (new layers have no transform).
+        """
+        nav_layers = self.svg.xpath('//svg:g[@inkscape:groupmode="layer" and @inkscape:label="navigation"]')
+        coordinates = {}
+        for element in elements:
+            position = self.get_composed_transform(element).apply_to_point(self.get_point_center(element))
+            if nav_layers:
+                position = self.to_element_coordinates(nav_layers[0], position)
+            coordinates[element] = (position.x, position.y)
+        return coordinates
 
-        Will draw a line representing the linked points if specified on the connection options.
+    @staticmethod
+    def format_metadata_number(value: float) -> str:
+        """ Number written on the flutter_maps:* geometry attributes (3 decimals, no trailing zeros, no negative zero) """
+        return f'{round(value, 3) + 0.0:.15g}'
+
+    def set_metadata_attribute(self, element: inkex.elements.BaseElement, name: str, value: str):
+        """ Sets a flutter_maps:* attribute of an existing element, recorded on the change set only if its value changes """
+        if element.get(name) == value:
+            return
+        element.set(name, value)
+        self.change_set.updated_attributes.append((element.get('id'), name))
+
+    def set_point_coordinates(self, element: inkex.elements.BaseElement, coordinates: Tuple[float, float]):
+        """ Stores the resolved navigation layer coordinates of a point on its flutter_maps:x / y attributes """
+        self.set_metadata_attribute(element, 'flutter_maps:x', self.format_metadata_number(coordinates[0]))
+        self.set_metadata_attribute(element, 'flutter_maps:y', self.format_metadata_number(coordinates[1]))
+
+    def get_line_point_ids(self, line: inkex.elements.BaseElement, a_id: int, b_id: int) -> Tuple[int, int]:
+        """ Point ids of a nav_line: its flutter_maps:a_id / b_id attributes, falling back to the numbers of its id (a_id, b_id) """
+        a_attr, b_attr = line.get('flutter_maps:a_id'), line.get('flutter_maps:b_id')
+        if a_attr and b_attr:
+            return self.decode_id_number(a_attr), self.decode_id_number(b_attr)
+        return a_id, b_id
+
+    def update_navigation_metadata(self, graph: 'FlutterMapExtension.NavigationGraph'):
         """
-        # consecutively connect points (a - b - c - d ...)
-        for i in range(len(elements_info) - 1):
-            # end condition to avoid index error (no more points available to link)
-            if i + 1 >= len(elements_info):
-                alert(f'No more objects to link. {i=}')
+        Brings the stored geometry of the whole navigation graph up to date in a single pass: the resolved coordinates of 
+        every point (flutter_maps:x / y) and the length of every line (flutter_maps:length, distance between the resolved 
+        coordinates of its points). Lines linking missing points are left untouched.
+        """
+        coordinates = self.resolve_navigation_coordinates(graph.points.handles) # type: ignore
+        for element in graph.points.handles: # type: ignore
+            self.set_point_coordinates(element, coordinates[element])
 
-            A = elements_info[i]
-            B = elements_info[i + 1]
+        for line, a_id, b_id in graph.lines:
+            a_id, b_id = self.get_line_point_ids(line, a_id, b_id)
+            if a_id not in graph.points or b_id not in graph.points:
+                continue
+            length = math.dist(coordinates[graph.point_element(a_id)], coordinates[graph.point_element(b_id)])
+            self.set_metadata_attribute(line, 'flutter_maps:length', self.format_metadata_number(length))
 
-            # include each other as neighbors (linking)
-            self.add_neighbour(A, str(B.id))
-            self.add_neighbour(B, str(A.id))
-            
-            # Update element id attribute
-            for info in [A, B]:
-                neighbors = info.neighbours
-                id_val = self.build_point_id_attr(info.id, neighbors)
-                info.el.set('id', id_val)
+    @staticmethod
+    def build_connection_path_data(a_center: Tuple[float, float], b_center: Tuple[float, float], a_transform: inkex.Transform, 
+                                   b_transform: inkex.Transform, copy_transform: str) -> str:
+        """ Path data of the line between the centers of points A and B, applying their transforms according to copy_transform """
+        if copy_transform in ('copy_from_a', 'copy_from_both'):
+            a_center = a_transform.apply_to_point(a_center)
+        if copy_transform in ('copy_from_b', 'copy_from_both'):
+            b_center = b_transform.apply_to_point(b_center)
+        return f"M {a_center[0]},{a_center[1]} L {b_center[0]},{b_center[1]}"
+
+    def build_connection_line(self, A: PointInfo, B: PointInfo, connection_options: PointConnectionOptions) -> inkex.PathElement:
+        """ Creates (without inserting it) the line representing the connection between points A and B """
+        # element transforms (identity if missing) are only parsed when they are copied
+        copy_transform = connection_options.copy_transform
+        identity = inkex.Transform()
+        path_data = self.build_connection_path_data(self.get_point_center(A.el), self.get_point_center(B.el),
+                                                    A.el.transform if copy_transform in ('copy_from_a', 'copy_from_both') else identity, 
+                                                    B.el.transform if copy_transform in ('copy_from_b', 'copy_from_both') else identity, 
+                                                    copy_transform)
+
+        # create svg line element
+        line = polygons.PathElement.new(path_data)
+
+        # Style line according to options (written as a raw attribute: the serialized style does not need to be parsed again)
+        line.attrib['style'] = connection_options.line_style
+        # Add metadata
+        line.set('flutter_maps:modified_by_code', 'inkscape_extension')
+        line.set('flutter_maps:a_id', self.encode_id_number(A.id))
+        line.set('flutter_maps:b_id', self.encode_id_number(B.id))
+        line.set('id', self.build_nav_line_id(A.id, B.id))
+        return line
+
+    def commit_point_connections(self, pairs_of_points: List[Tuple[PointInfo, PointInfo]], connection_options: PointConnectionOptions):
+        """
+        Batch connection stage:
+         1. collects the deduplicated undirected edge set of the pairs (A to B and B to A are the same edge, self connections dropped)
+         2. merges the edges into the points adjacency (PointInfo.neighbours)
+         3. writes the id attribute (and the flutter_maps:x / y coordinates) of each touched element exactly once
+         4. creates the lines missing for the edges, with their flutter_maps:length, and inserts them at once in the navigation layer (if draw_lines is set)
 
-            # set z-order 1 level below points z-order
-            if connection_options.draw_lines: 
+        A point must be represented by the same PointInfo instance on all the pairs it is part of.
+        """
+        # 1. deduplicated undirected edge set (keeping the first seen orientation)
+        edges: List[Tuple[FlutterMapExtension.PointInfo, FlutterMapExtension.PointInfo]] = []
+        seen_edges = set()
+        for A, B in pairs_of_points:
+            edge_key = (A.id, B.id) if int(A.id) < int(B.id) else (B.id, A.id)
+            if A.id == B.id or edge_key in seen_edges:
+                continue
+            seen_edges.add(edge_key)
+            edges.append((A, B))
 
+        # 2. merge into the adjacency, keeping track of the points to update (insertion ordered, no duplicates)
+        touched_points: Dict[str, FlutterMapExtension.PointInfo] = {}
+        for A, B in edges:
+            # include each other as neighbors (linking)
+            self.add_neighbour(A, B.id)
+            self.add_neighbour(B, A.id)
+            touched_points.setdefault(A.id, A)
+            touched_points.setdefault(B.id, B)
+
+        # 3. single id write per element, together with its resolved coordinates
+        coordinates = self.resolve_navigation_coordinates([info.el for info in touched_points.values()])
+        for info in touched_points.values():
+            self.set_element_id(info.el, self.build_point_id_attr(info.id, info.neighbours))
+            self.set_point_coordinates(info.el, coordinates[info.el])
+
+        # 4. lines, existing ones are looked up once for the whole batch
+        new_lines = []
+        if connection_options.draw_lines:
+            existing_line_ids = {line.get('id') for line in self.svg.xpath('//*[starts-with(@id, "nav_line-")]')}
+            for A, B in edges:
                 # do not draw line if the line for this connection already exists
-                existing_lines = self.svg.xpath(f'//*[@id="nav_line-{str(A.id)}-{str(B.id)}" or @id="nav_line-{str(B.id)}-{str(A.id)}"]')
-                if len(existing_lines) > 0:
-                    self.msg(f'\n=> A line representing the connection between "{f"point-{A.id}"}" and "{f"point-{B.id}"}" already exists: {[e.get("id") for e in existing_lines]},' 
+                existing_lines = [line_id for line_id in (self.build_nav_line_id(A.id, B.id), self.build_nav_line_id(B.id, A.id)) if line_id in existing_line_ids]
+                if existing_lines:
+                    self.msg(f'\n=> A line representing the connection between "{f"point-{self.encode_id_number(A.id)}"}" and "{f"point-{self.encode_id_number(B.id)}"}" already exists: {existing_lines},' 
                              ' line drawing will be skipped. You can delete such line and connect again both points if you would like the extension to draw a new line')
                     continue
 
-                # read coordinates from cx/cy (strip units), fallback to bounding box calculation
-                get_center = lambda el: (
-                    float(cx if (cx := el.get('cx')) else el.bounding_box().center.x),
-                    float(cy if (cy := el.get('cy')) else el.bounding_box().center.y)
-                )
+                line = self.build_connection_line(A, B, connection_options)
+                line.set('flutter_maps:length', self.format_metadata_number(math.dist(coordinates[A.el], coordinates[B.el])))
+                existing_line_ids.add(line.get('id'))
+                new_lines.append(line)
+                self.msg(f'\n=> Connected point "{A.el.get("id")}" & "{B.el.get("id")}". Line: "{line.get("id")}"')
+
+            if new_lines:
+                # Add lines to points layer at once (at the start, so on top of other svg objects but behind points)
+                points_layer = self.get_navigation_layer()
+                points_layer[0:0] = new_lines
+                # slice assignment bypasses inkex's tree callbacks, so the new line ids are registered by hand
+                for line in new_lines:
+                    self.svg.add_to_tree_callback(line)
+                self.change_set.added_lines.extend(line.get('id') for line in new_lines)
+        else:
+            for A, B in edges:
+                self.msg(f'\n=> Connected point "{A.el.get("id")}" & "{B.el.get("id")}". Line: "No line drawed"')
 
-                ax, ay = get_center(A.el)
-                bx, by = get_center(B.el)
-
-                # parse transforms (identity if missing)
-                t_a = inkex.Transform(A.el.get('transform') or '')
-                t_b = inkex.Transform(B.el.get('transform') or '')
-
-                # apply transforms according to option
-                copy_transform = connection_options.copy_transform
-                if copy_transform == 'copy_from_a':
-                    start = t_a.apply_to_point((ax, ay))
-                    end   = [bx, by]
-                elif copy_transform == 'copy_from_b':
-                    start = [ax, ay]
-                    end   = t_b.apply_to_point((bx, by))
-                elif copy_transform == 'copy_from_both':
-                    start = t_a.apply_to_point((ax, ay))
-                    end   = t_b.apply_to_point((bx, by))
-                else:  # no_copy
-                    start = [ax, ay]
-                    end   = [bx, by]
-
-                # create svg line element if indicated: 
-                line = polygons.PathElement.new(f"M {start[0]},{start[1]} L {end[0]},{end[1]}")
-
-                # Style line according to options
-                line.style['stroke'] = connection_options.line_color
-                line.style['stroke-width']= connection_options.lines_stroke
-                # Add metadata
-                line.set('flutter_maps:modified_by_code', 'inkscape_extension')
-                line.set('flutter_maps:a_id', str(A.id))
-                line.set('flutter_maps:b_id', str(B.id))
-                line.set('id', f'nav_line-{line.get("flutter_maps:a_id")}-{line.get("flutter_maps:b_id")}')
-
-                # DRAW THE LINE ON THE NAVIGATION LAYER
-
-                # Check if there is a "navigation" layer in the document, otherwise create it
-                query = '//svg:g[@inkscape:groupmode="layer" and @inkscape:label="navigation"]'
-                layers_search_result = self.svg.xpath(query)
-
-                if layers_search_result:
-                    points_layer = layers_search_result[0]
-                else:
-                    points_layer = inkex.Layer.new("navigation")
-                    self.svg.add(points_layer)
+    def connect_using_point_info(self, elements_info: List[PointInfo], connection_options: PointConnectionOptions): 
+        """
+        Takes a List with PointInfo as elements, iterates over them and connects them in sequential order. 
+        Connection / Link is store in both elements id attribute
 
-                # MOVE the layer to the very bottom of the XML tree (Top Z-index)
-                # Even if it already existed elsewhere, this moves it to the end.
-                self.svg.append(points_layer)
+        If the list has [A, B], then connects (A to B & B to A) 
+        If the list has [A, B, C], then connects (A to B, B to A) & (B to C, C to B)
 
-                # Add line to points layer (at the end, so on top of other svg objects but behind points)
-                points_layer.insert(0, line)
-            
-            self.msg(f'\n=> Connected point "{A.el.get("id")}" & "{B.el.get("id")}". Line: "{line.get("id") if connection_options.draw_lines else "No line drawed"}"')
+        This strategy is done until there are no more elements to process. 
+
+        Will draw a line representing the linked points if specified on the connection options.
+        """
+        # consecutively connect points (a - b - c - d ...)
+        pairs_of_points = [(elements_info[i], elements_info[i + 1]) for i in range(len(elements_info) - 1)]
+        self.commit_point_connections(pairs_of_points=pairs_of_points, connection_options=connection_options)
 
     def sequentially_connect_points(self, connection_options: PointConnectionOptions = PointConnectionOptions()):
         """
@@ -1116,27 +2665,26 @@ class FlutterMapExtension(inkex.EffectExtension):
         Sorting based on Y / X axis is sopported (asc and desc direction)
         """
         # Input Validation: at least 2 selected elements
-        selected_elements: selected.ElementList = self.svg.selected
-        if not selected_elements or len(selected_elements) <= 0:
+        if self.operation_scope == self.OperationScope.SELECTION and not self.svg.selected:
             raise inkex.AbortExtension("No selection: Need to select at least 2 objects")
 
         # Input Filtering: ellipses and circles only (elipse for connection points and circles for entrances)
-        # NOTE: selected_elements holds the elements in the user selection order
+        # NOTE: scope elements hold the elements in the user selection order (document order for layer scopes)
 
         valid_elements= tuple(self.element_types_for_points())
-        selected_ellipses: List = list(selected_elements.filter(valid_elements))
+        selected_ellipses: List = self.get_scope_elements(valid_elements)
 
         # Input Validation: at least 2 selected ellipses / circles (remaining elements after filtering)
         if len(selected_ellipses) < 2:
-            raise inkex.AbortExtension( f"Not enough ellipses selected. Need at least 2, got {len(selected_ellipses)}.")
+            raise inkex.AbortExtension( f"Not enough ellipses in the {self.describe_scope()}. Need at least 2, got {len(selected_ellipses)}.")
 
         # Input Sorting: sort selected elements if specified
         use_reverse_sorting = (connection_options.sort_direction == self.PointConnectionOptions.SortDirection.DESCENDING)
 
         if connection_options.sort_mode == self.PointConnectionOptions.SortMode.X_AXIS:
-            selected_ellipses.sort(key=lambda e: e.bounding_box().center[0], reverse=use_reverse_sorting)
+            selected_ellipses.sort(key=lambda e: self.get_bounding_box(e).center[0], reverse=use_reverse_sorting)
         elif connection_options.sort_mode == self.PointConnectionOptions.SortMode.Y_AXIS: 
-            selected_ellipses.sort(key=lambda e: e.bounding_box().center[1], reverse=use_reverse_sorting)
+            selected_ellipses.sort(key=lambda e: self.get_bounding_box(e).center[1], reverse=use_reverse_sorting)
 
         # Input Normalization: extract and group required information for connection operation
 
@@ -1162,189 +2710,189 @@ class FlutterMapExtension(inkex.EffectExtension):
         # connect points: Use normalized information (DTOs List) to connects the svg elements in the lists order
         self.connect_using_point_info(elements_info=elements_info, connection_options=connection_options)
         
-    def get_displacement_entrance_coordinates(
-        self,
-        entrance_x: float,
-        entrance_y: float,
-        building_bbox: inkex.BoundingBox,
-        entrance_bbox: inkex.BoundingBox,
+    # Per entrance position: (x anchor fraction of the bbox width, y anchor fraction of the bbox height, 
+    # horizontal side [-1 left, 0 none, 1 right], vertical side [-1 upper, 0 none, 1 lower])
+    ENTRANCE_POSITION_TABLE = {
+        BuildingOptions.PointPosition.UPPER_LEFT:   (0.0, 0.0, -1, -1),
+        BuildingOptions.PointPosition.UPPER_CENTER: (0.5, 0.0,  0, -1),
+        BuildingOptions.PointPosition.UPPER_RIGHT:  (1.0, 0.0,  1, -1),
+        BuildingOptions.PointPosition.CENTER_LEFT:  (0.0, 0.5, -1,  0),
+        BuildingOptions.PointPosition.CENTER:       (0.5, 0.5,  0,  0),
+        BuildingOptions.PointPosition.CENTER_RIGHT: (1.0, 0.5,  1,  0),
+        BuildingOptions.PointPosition.LOWER_LEFT:   (0.0, 1.0, -1,  1),
+        BuildingOptions.PointPosition.LOWER_CENTER: (0.5, 1.0,  0,  1),
+        BuildingOptions.PointPosition.LOWER_RIGHT:  (1.0, 1.0,  1,  1),
+    }
+
+    # Per separation type: (border offset direction [-1 inside, 0 none, 1 outside], 10% of the bbox size direction)
+    ENTRANCE_SEPARATION_TABLE = {
+        BuildingOptions.PointToBorderSeparation.CENTER_TO_CENTER:          ( 0,  0),
+        BuildingOptions.PointToBorderSeparation.BORDER_TO_BORDER_IN:       (-1,  0),
+        BuildingOptions.PointToBorderSeparation.BORDER_TO_BORDER_OUT:      ( 1,  0),
+        BuildingOptions.PointToBorderSeparation.TEN_PERCENT_TO_BORDER_IN:  (-1, -1),
+        BuildingOptions.PointToBorderSeparation.TEN_PERCENT_TO_BORDER_OUT: ( 1,  1),
+    }
+
+    @classmethod
+    def compute_entrance_positions(
+        cls,
+        building_bboxes: 'numpy.ndarray',
         point_position: 'FlutterMapExtension.BuildingOptions.PointPosition',
         separation_type: 'FlutterMapExtension.BuildingOptions.PointToBorderSeparation',
-        custom_separation: Union[str, None] = None,
-    ) -> tuple[float, float]:
+        point_radius: float,
+    ) -> 'numpy.ndarray':
         """
-        Calculates the displaced entrance coordinates based on the specified separation type.
+        Computes the entrance coordinates (same coordinate space as the bboxes) of a batch of buildings in a single vectorized step.
 
-        :param entrance_x: Original x-coordinate of the entrance.
-        :param entrance_y: Original y-coordinate of the entrance.
-        :param building_bbox: Bounding box of the building.
-        :param entrance_bbox: Bounding box of the entrance.
+        The anchor on the building bbox and the displacement from it are resolved once from the position / separation tables
+        and applied to the whole bbox table with a couple of array multiply-adds:
+            - border to border: the entrance circle touches the border from the inside / outside (one radius along the side's axis, 
+              the horizontal one for corners)
+            - 10% to border: same as border to border plus 10% of the bbox size towards the inside / outside on both axes
+
+        :param building_bboxes: (n, 4) array with the left, top, width and height of the bbox of each building.
+        :param point_position: Position of the entrances relative to the building's bbox.
         :param separation_type: Type of separation to apply.
-        :param custom_separation: Custom separation value if applicable.
+        :param point_radius: Radius of the entrance points.
 
-        :return: Tuple containing the new x and y coordinates of the entrance.
+        :return: (n, 2) array with the (x, y) coordinates of the entrance of each building (in the bboxes order).
         """
+        import numpy as np
 
-        building_options = self.BuildingOptions
-
-        # Extract building borders
-        building = {
-            "left":   building_bbox.left,
-            "right":  building_bbox.right,
-            "top":    building_bbox.top,
-            "bottom": building_bbox.bottom,
-            "w":      building_bbox.width,
-            "h":      building_bbox.height,
-        }
-
-        # Extract entrance borders
-        entrance = {
-            "left":   entrance_bbox.left,
-            "right":  entrance_bbox.right,
-            "top":    entrance_bbox.top,
-            "bottom": entrance_bbox.bottom,
-            "w":      entrance_bbox.width,
-            "h":      entrance_bbox.height,
-        }
+        if separation_type == cls.BuildingOptions.PointToBorderSeparation.CUSTOM:
+            raise NotImplementedError('Custom point separation not implemented yet.')
+        if separation_type not in cls.ENTRANCE_SEPARATION_TABLE:
+            raise ValueError(f'Unknown separation type: {separation_type}')
+        if point_position not in cls.ENTRANCE_POSITION_TABLE:
+            raise inkex.AbortExtension(f'Unhandled entrance position {point_position}')
 
-        # --------- HELPERS ------------------------------------------------------
-
-        def border_to_border_in_displacement():
-            if point_position in (
-                building_options.PointPosition.UPPER_LEFT,
-                building_options.PointPosition.CENTER_LEFT,
-                building_options.PointPosition.LOWER_LEFT,
-            ):
-                return building["left"] - entrance["left"], 0
-
-            if point_position in (
-                building_options.PointPosition.UPPER_RIGHT,
-                building_options.PointPosition.CENTER_RIGHT,
-                building_options.PointPosition.LOWER_RIGHT,
-            ):
-                return building["right"] - entrance["right"], 0
-
-            if point_position == building_options.PointPosition.UPPER_CENTER:
-                return 0, building["top"] - entrance["top"]
-
-            if point_position == building_options.PointPosition.LOWER_CENTER:
-                return 0, building["bottom"] - entrance["bottom"]
-
-            return 0, 0
-
-        def border_to_border_out_displacement():
-            if point_position in (
-                building_options.PointPosition.UPPER_LEFT,
-                building_options.PointPosition.CENTER_LEFT,
-                building_options.PointPosition.LOWER_LEFT,
-            ):
-                return building["left"] - entrance["right"], 0
-
-            if point_position in (
-                building_options.PointPosition.UPPER_RIGHT,
-                building_options.PointPosition.CENTER_RIGHT,
-                building_options.PointPosition.LOWER_RIGHT,
-            ):
-                return building["right"] - entrance["left"], 0
-
-            if point_position == building_options.PointPosition.UPPER_CENTER:
-                return 0, building["top"] - entrance["bottom"]
-
-            if point_position == building_options.PointPosition.LOWER_CENTER:
-                return 0, building["bottom"] - entrance["top"]
-
-            return 0, 0
-
-        def ten_percent_direction_vector(outside: bool):
-            # Sign depends on OUT vs IN
-            mult = 1 if outside else -1
-
-            # Horizontal
-            if point_position in ( 
-                building_options.PointPosition.UPPER_LEFT,
-                building_options.PointPosition.CENTER_LEFT,
-                building_options.PointPosition.LOWER_LEFT):
-                dx = -0.1 * building["w"] * mult
-            elif point_position in (
-                building_options.PointPosition.UPPER_RIGHT,
-                building_options.PointPosition.CENTER_RIGHT,
-                building_options.PointPosition.LOWER_RIGHT,
-            ):
-                dx = 0.1 * building["w"] * mult
-            else:
-                dx = 0
-
-            # Vertical
-            if point_position in (
-                building_options.PointPosition.UPPER_LEFT,
-                building_options.PointPosition.UPPER_CENTER,
-                building_options.PointPosition.UPPER_RIGHT,
-            ):
-                dy = -0.1 * building["h"] * mult
-            elif point_position in (
-                building_options.PointPosition.LOWER_LEFT,
-                building_options.PointPosition.LOWER_CENTER,
-                building_options.PointPosition.LOWER_RIGHT,
-            ):
-                dy = 0.1 * building["h"] * mult
-            else:
-                dy = 0
+        fx, fy, horizontal_side, vertical_side = cls.ENTRANCE_POSITION_TABLE[point_position]
+        border_direction, ten_percent_direction = cls.ENTRANCE_SEPARATION_TABLE[separation_type]
 
-            return dx, dy
+        # the border offset goes along the horizontal axis when the position has a horizontal side, along the vertical one otherwise
+        offset_x = horizontal_side * border_direction * point_radius
+        offset_y = vertical_side * border_direction * point_radius if horizontal_side == 0 else 0.0
+        # 10% offsets, still to be scaled by the bbox size
+        ten_percent_x = 0.1 * horizontal_side * ten_percent_direction
+        ten_percent_y = 0.1 * vertical_side * ten_percent_direction
 
-        # --------- MAIN LOGIC ---------------------------------------------------
+        left, top, width, height = np.asarray(building_bboxes, dtype=float).reshape(-1, 4).T
+        return np.column_stack((left + (fx + ten_percent_x) * width + offset_x, 
+                                top + (fy + ten_percent_y) * height + offset_y))
 
-        if point_position == building_options.PointPosition.CENTER:  # Center position, no separation adjustment needed
-            return 0,0
+    @staticmethod
+    def apply_transforms(hexads: 'numpy.ndarray', xs: 'numpy.ndarray', ys: 'numpy.ndarray') -> Tuple['numpy.ndarray', 'numpy.ndarray']:
+        """ 
+        Applies affine transforms to a batch of points at once: hexads holds the (a, b, c, d, e, f) matrix of each point 
+        as rows (n, 6) or a single matrix shared by all of them (6,). Same operations as inkex.Transform.apply_to_point.
+        """
+        a, b, c, d, e, f = hexads.T
+        return a * xs + c * ys + e, b * xs + d * ys + f
 
-        if separation_type == building_options.PointToBorderSeparation.BORDER_TO_BORDER_IN:
-            dx, dy = border_to_border_in_displacement()
+    def get_document_spatial_index(self) -> BoundingBoxRTree:
+        """
+        Run-scoped R-tree over the navigation elements of the whole document, in document coordinates. Items are (kind, element) tuples:
+            - ('point', element) / ('entrance', element): point centers, building entrances are kept apart as they are not navigation points
+            - ('building', element): building bounding boxes
 
-        elif separation_type == building_options.PointToBorderSeparation.BORDER_TO_BORDER_OUT:
-            dx, dy = border_to_border_out_displacement()
+        Built once per run and shared by the operations needing spatial queries (smart connect, entrance linking, connectivity report). 
+        Elements created / deleted by the extension after it is built have to be inserted / deleted too 
+        (see add_to_document_spatial_index / remove_from_document_spatial_index).
+        """
+        if self.document_spatial_index is not None:
+            return self.document_spatial_index
 
-        elif separation_type == building_options.PointToBorderSeparation.TEN_PERCENT_TO_BORDER_IN:
-            # Inside the building, 10% displaced from the the border
-            base_dx, base_dy = border_to_border_in_displacement()
-            extra_dx, extra_dy = ten_percent_direction_vector(outside=False)
-            dx, dy = base_dx + extra_dx, base_dy + extra_dy
+        valid_elements = tuple(self.element_types_for_points())
+        entrances_ids = set()
+        points = []
+        entries = []
 
-        elif separation_type == building_options.PointToBorderSeparation.TEN_PERCENT_TO_BORDER_OUT:
-            # Outside the building, 10% displaced from the the border
-            base_dx, base_dy = border_to_border_out_displacement()
-            extra_dx, extra_dy = ten_percent_direction_vector(outside=True)
-            dx, dy = base_dx + extra_dx, base_dy + extra_dy
+        # single document walk classifying points and buildings
+        for element in self.svg.xpath('//*[@id]'):
+            id_str = element.get('id')
+            point_id = self.get_point_id_number(id_str)
+            if point_id is not None:
+                if isinstance(element, valid_elements):
+                    points.append((point_id, element))
+                continue
+            building_id, entrances, _, _ = self._extract_relations_from_building(id_str=id_str)
+            if building_id is not None:
+                entrances_ids.update(entrances)
+                bbox = self.get_bounding_box(element, document_coordinates=True)
+                if bbox is not None:
+                    entries.append(((bbox.left, bbox.top, bbox.right, bbox.bottom), ('building', element)))
+
+        for point_id, element in points:
+            entries.append((self.get_spatial_index_box('point', element), ('entrance' if point_id in entrances_ids else 'point', element)))
+
+        self.document_spatial_index = BoundingBoxRTree(entries)
+        return self.document_spatial_index
+
+    def get_spatial_index_box(self, kind: str, element: inkex.elements.BaseElement) -> Tuple[float, float, float, float]:
+        """ Box of an element on the document spatial index: the bbox of buildings, the (degenerate) center box of points """
+        if kind == 'building':
+            bbox = self.get_bounding_box(element, document_coordinates=True)
+            return (bbox.left, bbox.top, bbox.right, bbox.bottom)
+        x, y = self.get_point_position(element, document_coordinates=True)
+        return (x, y, x, y)
+
+    def add_to_document_spatial_index(self, kind: str, element: inkex.elements.BaseElement):
+        """ Inserts an element created by the extension into the document spatial index (if it was built) """
+        if self.document_spatial_index is None:
+            return
+        self.document_spatial_index.insert(self.get_spatial_index_box(kind, element), (kind, element))
 
-        elif separation_type == building_options.PointToBorderSeparation.CUSTOM:
-            raise NotImplementedError('Custom point separation not implemented yet.')
-        else:
-            raise ValueError(f'Unknown separation type: {separation_type}')
+    def remove_from_document_spatial_index(self, element: inkex.elements.BaseElement):
+        """ Removes a point element the extension is about to delete from the document spatial index (if it was built) """
+        if self.document_spatial_index is None:
+            return
+        box = self.get_spatial_index_box('point', element)
+        if not self.document_spatial_index.delete(box, ('point', element)):
+            self.document_spatial_index.delete(box, ('entrance', element))
 
-        return dx, dy
+    @staticmethod
+    def find_nearest_indexed_point(position: inkex.Vector2d, spatial_index: BoundingBoxRTree, max_distance: float) -> Optional[inkex.elements.BaseElement]:
+        """
+        Returns the navigation point (entrances excluded) of the document spatial index (see get_document_spatial_index) 
+        nearest to position within max_distance, None if there is no point that close.
+        """
+        for _, (kind, element) in spatial_index.nearest(position.x, position.y, max_distance):
+            if kind == 'point':
+                return element
+        return None
 
     def add_building(self, building_options: BuildingOptions = BuildingOptions(), sort_mode: str ='no_sort', 
-                     sort_direction: str ='asc', entrance_point_options: EntrancePointOptions = EntrancePointOptions()):
+                     sort_direction: str ='asc', entrance_point_options: EntrancePointOptions = EntrancePointOptions(),
+                     link_entrances: bool = False, entrance_link_max_distance: str = '10px',
+                     connection_options: PointConnectionOptions = PointConnectionOptions(), walls_layer: str = ''):
         """
         Adds a building element to the map at a specified location with given properties.
 
+        On layer and document scopes the navigation, walls (walls_layer) and connectivity report layers are left out,
+        so their points, lines and wall strokes never become buildings.
+
+        If link_entrances is set, each created entrance point is connected to the nearest existing navigation point 
+        (other entrances excluded) within entrance_link_max_distance, drawing the line according to connection_options.
+        All the entrance links are committed at once after the buildings are processed.
         """
 
-        selected_elements: selected.ElementList = self.svg.selected
-        if not selected_elements or len(selected_elements) <= 0:
+        if self.operation_scope == self.OperationScope.SELECTION and not self.svg.selected:
             raise inkex.AbortExtension("No selection: Need to select at least 2 objects")
             
-        # get selected objects in selection order
-        selected_objects: List = list(selected_elements)
+        # get selected objects in selection order (the objects of each layer, in document order, for layer scopes)
+        selected_objects: List = self.get_scope_elements(
+            top_level_only=True, excluded_layers=('navigation', walls_layer, self.CONNECTIVITY_LAYER_LABEL)
+        )
 
         if len(selected_objects) < 1:
-            raise inkex.AbortExtension( f"Not enough objects selected. Need at least 2, got {len(selected_objects)}.")
+            raise inkex.AbortExtension( f"Not enough objects in the {self.describe_scope()}. Need at least 1, got {len(selected_objects)}.")
 
         use_reverse_sorting = (sort_direction == 'desc')
         if sort_mode == 'sort_horizontally':
-            selected_objects.sort(key=lambda e: e.bounding_box().center[0], reverse=use_reverse_sorting)
+            selected_objects.sort(key=lambda e: self.get_bounding_box(e).center[0], reverse=use_reverse_sorting)
 
         elif sort_mode == 'sort_vertically':
-            selected_objects.sort(key=lambda e: e.bounding_box().center[1], reverse=use_reverse_sorting)
+            selected_objects.sort(key=lambda e: self.get_bounding_box(e).center[1], reverse=use_reverse_sorting)
 
         # find max existing building-N index across the whole document to assign new IDs
         max_id_number = 0
@@ -1355,7 +2903,7 @@ class FlutterMapExtension(inkex.EffectExtension):
                 continue  # skip non-matching ids
 
             # altough there is an optional building subtype, the group index for numeric will always be group 3
-            id_number = int(matches.group(3))
+            id_number = self.decode_id_number(matches.group(3))
             if id_number > max_id_number:
                 max_id_number = id_number
 
@@ -1363,10 +2911,10 @@ class FlutterMapExtension(inkex.EffectExtension):
         # create list with entries containing: the element, numeric id & neighbours
         elem_info: List[FlutterMapExtension.BuildingInfo] = []
         for element in selected_objects:
-            id_attr = element.get('id')
+            id_attr = element.get('id') or ''
             # remove elements that are flutter-map points, if we find any likely means that some of the buildings are already linked to a point, we can later retrieve that 
-            # point elemnent if required using the building's entrances_ids 
-            if self.POINT_ID_REGEX.match(id_attr):
+            # point elemnent if required using the building's entrances_ids. Navigation lines are never buildings either
+            if self.POINT_ID_REGEX.match(id_attr) or self.NAV_LINE_ID_REGEX.match(id_attr):
                 continue
 
             building_type, building_subtype, building_id, entrances_ids = self.parse_building_id(id_attr)
@@ -1392,203 +2940,627 @@ class FlutterMapExtension(inkex.EffectExtension):
         
 
 
-        layer = self.svg.get_current_layer()
+        # Document spatial index (shared by the run), entrances are never used as link targets
+        entrance_link_index = None
+        entrance_links: List[List[inkex.elements.BaseElement]] = []
+        if link_entrances and building_options.add_connection_point:
+            link_distance_value, link_distance_unit = FlutterMapExtension.extract_unit_from_text_expression(entrance_link_max_distance)
+            if (link_distance_value is None) or (link_distance_unit is None):
+                raise inkex.AbortExtension(f'invalid units value provided for entrance link max distance: "{entrance_link_max_distance}"')
+            entrance_link_max_dist = convert_unit(link_distance_value, link_distance_unit)
+            entrance_link_index = self.get_document_spatial_index()
+
         # Now we procceed to determine the atributes for each building and create their associated connnection point if expecified, 
-        # We have already filtered flutter-map points from elem_info so we only have buildings to process
+        # We have already filtered flutter-map points from elem_info so we only have buildings to process.
+        # Entrances are placed in bulk: bboxes are gathered first, their positions computed in a single pass 
+        # and all the created points are inserted in the navigation layer with a single operation
+        buildings_with_entrance: List[FlutterMapExtension.BuildingInfo] = []
+        building_bboxes: List[inkex.BoundingBox] = []
+        for building_info in elem_info:
+            if len(building_info.neighbours) > 0:
+                self.msg(f'Building ID {building_info.id} already has entrance points defined: {building_info.neighbours}. Skipping entrance point creation.')
+                continue
+            if not building_options.add_connection_point:
+                continue
 
+            bbox = self.get_bounding_box(building_info.el)
+            if bbox is None:
+                self.msg(f'Warning: Could not get bounding box for building {building_info.id}. Skipping entrance creation.')
+                continue
+            buildings_with_entrance.append(building_info)
+            building_bboxes.append(bbox)
 
-        last_created_point_id_number = None
-        for building_info in elem_info:
+        if not buildings_with_entrance:
+            return
 
-            # we will: 
-            # 1. get / create the building connection point (entrance)
-            # 2. determine the entrance coordinates based on building bounding box and options
-            # 3. Add the relationship between building and entrance point (adding entrance id to building id attribute). Poitn will not have building id in its id attribute.
-            # 4. create and draw the point / entrance svg element if required
-            # 5. Finally, update the building & point elements id attributes (inkex does not automatically update them due to performance reasons)
+        # Point position & separation will always be defined if add_connection_point is True
+        separation_type = building_options.point_to_border_separation
+        assert separation_type is not None, "Separation type must be defined when creating entrance point."
+        import numpy as np
+        entrance_positions = self.compute_entrance_positions(
+            building_bboxes=np.array([(bbox.left, bbox.top, bbox.width, bbox.height) for bbox in building_bboxes], dtype=float),
+            point_position=building_options.building_point_position, # type: ignore
+            separation_type=separation_type,
+            point_radius=entrance_point_options.point_radius
+        )
 
-            building_element = building_info.el
+        # Get the "navigation" layer (created if missing), entrance points are added to that layer 
+        # so we avoid any transform issues with the current layer
+        points_layer = self.get_navigation_layer()
+        next_point_id = self.get_max_existing_object_id(self.svg.get_ids(), self.get_point_id_number)
+
+        # Normalize the coordinates: the bboxes are in the space of each building's parent, so the parent's composed 
+        # transform gives the document positions (prevents "double-scaling") and the inverse transform of the navigation 
+        # layer the positions relative to it. Each parent matrix is resolved once and all the positions are mapped at once
+        parent_hexads: Dict[Any, Tuple[float, ...]] = {}
+        for building_info in buildings_with_entrance:
+            parent = building_info.el.getparent()
+            if parent not in parent_hexads:
+                parent_hexads[parent] = tuple(self.get_composed_transform(parent).to_hexad())
+        global_xs, global_ys = self.apply_transforms(
+            np.array([parent_hexads[building_info.el.getparent()] for building_info in buildings_with_entrance], dtype=float),
+            entrance_positions[:, 0], entrance_positions[:, 1])
+        local_xs, local_ys = self.apply_transforms(
+            np.array(tuple((-self.get_composed_transform(points_layer)).to_hexad()), dtype=float), global_xs, global_ys)
+
+        entrance_elements: List[inkex.elements.BaseElement] = []
+        for index, building_info in enumerate(buildings_with_entrance):
             building_id = building_info.id
-            building_subtype = building_info.subtype
-            building_type = building_info.type
-            entrances_ids = building_info.neighbours
-            
-            should_create_entrance_point = building_options.add_connection_point
-
-            if len(entrances_ids) > 0:
-                self.msg(f'Building ID {building_id} already has entrance points defined: {entrances_ids}. Skipping entrance point creation.')
-                should_create_entrance_point = False
-            
-            
-            if should_create_entrance_point:
-                # Get next available point ID, (takes into account ids that may have been created in previous iterations)
-                max_point_id_number = last_created_point_id_number if last_created_point_id_number \
-                    else self.get_max_existing_object_id(self.svg.get_ids(), self.get_point_id_number)
-                next_point_id = self.get_next_object_id(max_point_id_number)
-
-                # 1. Determine entrance position based on building bounding box
-                bbox = building_element.bounding_box()
-                if bbox is None:
-                    self.msg(f'Warning: Could not get bounding box for building {building_id}. Skipping entrance creation.')
-                    continue
-                    
-                # Calculate entrance position based on building options. 
-
-                point_position = building_options.building_point_position  # Point position will always be defined if should_create_entrance_point is True
-
-                if point_position == building_options.PointPosition.LOWER_CENTER:
-                    entrance_x = (bbox.left + bbox.right) / 2
-                    entrance_y = bbox.bottom 
-
-                elif point_position == building_options.PointPosition.LOWER_LEFT:
-                    entrance_x = bbox.left
-                    entrance_y = bbox.bottom
-                    
-                elif point_position == building_options.PointPosition.LOWER_RIGHT:
-                    entrance_x = bbox.right
-                    entrance_y = bbox.bottom
-                    
-                elif point_position == building_options.PointPosition.CENTER:
-                    entrance_x = (bbox.left + bbox.right) / 2
-                    entrance_y = (bbox.top + bbox.bottom) / 2
-                    
-                elif point_position == building_options.PointPosition.CENTER_LEFT:
-                    entrance_x = bbox.left
-                    entrance_y = (bbox.top + bbox.bottom) / 2
-                    
-                elif point_position == building_options.PointPosition.CENTER_RIGHT:
-                    entrance_x = bbox.right
-                    entrance_y = (bbox.top + bbox.bottom) / 2
-                    
-                elif point_position == building_options.PointPosition.UPPER_CENTER:
-                    entrance_x = (bbox.left + bbox.right) / 2
-                    entrance_y = bbox.top
-                    
-                elif point_position == building_options.PointPosition.UPPER_LEFT:
-                    entrance_x = bbox.left 
-                    entrance_y = bbox.top 
-                    
-                elif point_position == building_options.PointPosition.UPPER_RIGHT:
-                    entrance_x = bbox.right
-                    entrance_y = bbox.top
-
-                else:  # Default to center if unknown
-                    self.msg(f'Warning: Unhandled entrance position {point_position}, aboring...')
-                    raise inkex.AbortExtension(f'Unhandled entrance position {point_position} for building {building_id}')
-                            
-                # 2. Create the entrance point SVG element
-                entrance_element = polygons.Circle.new(
-                    center= (entrance_x, entrance_y),
-                    radius=entrance_point_options.point_radius # Allow configuring entrance point radius via building options
-                )
+            next_point_id = self.get_next_object_id(next_point_id)
+            entrance_x, entrance_y = float(entrance_positions[index, 0]), float(entrance_positions[index, 1])
+            global_pos = inkex.Vector2d(float(global_xs[index]), float(global_ys[index]))
+            local_target = inkex.Vector2d(float(local_xs[index]), float(local_ys[index]))
+
+            entrance_element = polygons.Circle.new(
+                center= (local_target.x, local_target.y),
+                radius=entrance_point_options.point_radius # Allow configuring entrance point radius via building options
+            )
 
-                
-                # 3. Move the entrance point according to separation options
-                bbox_entrance = entrance_element.bounding_box()  # Force bbox calculation
-                assert bbox_entrance is not None, "Entrance bounding box could not be determined after creation."
+            # Set entrance point metadata
+            entrance_element.set('flutter_maps:type', 'point')
+            entrance_element.set('flutter_maps:subtype', 'entrance')
+            entrance_element.set('flutter_maps:building_id', self.encode_id_number(building_id))
+            entrance_element.set('flutter_maps:x', self.format_metadata_number(local_target.x))
+            entrance_element.set('flutter_maps:y', self.format_metadata_number(local_target.y))
+            entrance_element.set('flutter_maps:modified_by_code', 'inkscape_extension')
+            entrance_element.set('inkscape:label', f'building_point:{self.encode_id_number(building_id)}')
+
+            # Style the entrance point based on specified options
+            entrance_element.style['fill'] = entrance_point_options.point_fill_color
+            entrance_element.style['stroke'] = entrance_point_options.point_stroke_color
+            entrance_element.style['stroke-width'] = entrance_point_options.point_stroke
+
+            # Add entrance point to the building's neighbours & store the entrance element for later use
+            building_info.neighbours.append(next_point_id)
+            building_info.entrance_element = entrance_element
+
+            # Update the selected object id so that it is now a building with a linked point (entrance)
+            self.set_element_id(building_info.el, self.build_building_id_attr(
+                building_type=building_info.type,
+                building_subtype=building_info.subtype,
+                id=int(building_id),
+                entrance_ids=building_info.neighbours # type: ignore
+            ))
+
+            # Set the point id (will not be linked to building id, the building is the only one that links to the point)
+            entrance_id_val = self.build_point_id_attr(id=str(next_point_id), neighbors_list=[])
+            entrance_element.set('id', entrance_id_val)
+            entrance_elements.append(entrance_element)
+            self.change_set.created_entrances.append(entrance_id_val)
+            self.msg(f'Created entrance point {next_point_id} for building {building_id} at ({entrance_x:.2f}, {entrance_y:.2f})')
+
+            # Find the navigation point the entrance will be linked to, if specified
+            if entrance_link_index is not None:
+                nearest_point = self.find_nearest_indexed_point(global_pos, entrance_link_index, entrance_link_max_dist)
+                if nearest_point is None:
+                    self.msg(f'\n=> No navigation point found within {entrance_link_max_dist} of entrance "{entrance_id_val}", it was left unlinked')
+                else:
+                    entrance_links.append([entrance_element, nearest_point])
 
-                separation_type = building_options.point_to_border_separation
-                assert separation_type is not None, "Separation type must be defined when creating entrance point."
+        # Add all the entrances to the layer at once (ids are registered on insertion)
+        points_layer.extend(entrance_elements)
+        for entrance_element in entrance_elements:
+            self.add_to_document_spatial_index('entrance', entrance_element)
 
+        # Link all the entrances to the navigation graph in a single batch
+        if entrance_links:
+            self.connect_element_pairs(pairs_of_elements=entrance_links, connection_options=connection_options)
 
-                entrance_dx, entrance_dy= self.get_displacement_entrance_coordinates(      
-                    entrance_x, entrance_y,
-                    bbox,
-                    bbox_entrance,
-                    point_position,
-                    separation_type,
-                    building_options.custom_point_separation
-                )
-                from inkex import Transform
-                            
-                # Set entrance point metadata
-                entrance_element.set('flutter_maps:type', 'point')
-                entrance_element.set('flutter_maps:subtype', 'entrance')
-                entrance_element.set('flutter_maps:building_id', building_id)
-                entrance_element.set('flutter_maps:modified_by_code', 'inkscape_extension')
-
-                # Style the entrance point based on specified options
-                entrance_element.style['fill'] = entrance_point_options.point_fill_color
-                entrance_element.style['stroke'] = entrance_point_options.point_stroke_color
-                entrance_element.style['stroke-width'] = entrance_point_options.point_stroke
-                
-                # Add entrance point to the building's neighbours
-                entrances_ids.append(next_point_id)
-                building_info.neighbours = entrances_ids
-                                    
-                # store the entrance element for later use
-                building_info.entrance_element = entrance_element
-                self.msg(f'Created entrance point {next_point_id} for building {building_id} at ({entrance_x:.2f}, {entrance_y:.2f})')
-            
-                # Update building element's ID attribute with entrance relationships
-                entrance_ids = building_info.neighbours
-                # Create the ID attribute string in format: 
-                building_id_val = self.build_building_id_attr(
-                    building_type=building_type,
-                    building_subtype=building_subtype,
-                    id=int(building_id),
-                    entrance_ids=entrance_ids # type: ignore
-                )
+    @staticmethod
+    def read_graph_records(import_file: str, floor_label: str = '') -> Iterator[Tuple[str, ...]]:
+        """
+        Streams the records of a nodes & edges file as ('node', key, x, y) / ('edge', key A, key B) tuples (keys and numbers as text):
+            - CSV files (.csv) are read row by row: the first column is the record kind (node / edge), a header row 
+              starting with "kind" as well as empty rows and rows starting with # are skipped
+            - JSON files hold {"nodes": [{"id": key, "x": x, "y": y}, ...], "edges": [[key A, key B], ...]}, 
+              the same layout as a floor of the multi floor graph (extra items of the edges, e.g. their length, are ignored)
+            - multi floor graphs ({"floors": [...]}) are read from the floor labeled floor_label, 
+              which can be left empty if the graph has a single floor
+        Raises AbortExtension if a JSON file has no nodes (or the floor is not found) instead of importing nothing.
+        """
+        if import_file.lower().endswith('.csv'):
+            import csv
+            with open(import_file, newline='', encoding='utf-8') as csv_file:
+                for row in csv.reader(csv_file):
+                    row = [cell.strip() for cell in row]
+                    if not row or not row[0] or row[0].startswith('#') or row[0].lower() == 'kind':
+                        continue
+                    yield (row[0].lower(), *row[1:])
+        else:
+            import json
+            with open(import_file, encoding='utf-8') as json_file:
+                graph = json.load(json_file)
+            if isinstance(graph, dict) and 'floors' in graph:
+                floors = {floor.get('label'): floor for floor in graph['floors']}
+                if not floor_label and len(floors) == 1:
+                    floor_label = next(iter(floors))
+                if floor_label not in floors:
+                    raise inkex.AbortExtension(f'"{import_file}" is a multi floor graph, the floor to import must be one of: ' + 
+                                               ', '.join(f'"{label}"' for label in floors) + (f' ("{floor_label}" not found)' if floor_label else ''))
+                graph = floors[floor_label]
+            if not isinstance(graph, dict) or 'nodes' not in graph:
+                raise inkex.AbortExtension(f'No "nodes" found on "{import_file}": JSON files must hold {{"nodes": [...], "edges": [...]}} or a multi floor graph')
+            for node in graph['nodes']:
+                yield ('node', str(node['id']), str(node['x']), str(node['y']))
+            for edge in graph.get('edges', []):
+                yield ('edge', str(edge[0]), str(edge[1]))
+
+    def import_graph(self, import_file: str, floor_label: str = '', point_options: EntrancePointOptions = EntrancePointOptions(),
+                     connection_options: PointConnectionOptions = PointConnectionOptions()):
+        """
+        Imports the nodes & edges of a CSV / JSON file (see read_graph_records, floor_label selects the floor of multi floor graphs) 
+        as navigation points and lines (see add_navigation_graph).
+        Node coordinates are navigation layer coordinates, node keys are only used to match the edges.
+        Edges to unknown nodes are reported and ignored.
+        """
+        if not import_file or not os.path.isfile(import_file):
+            raise inkex.AbortExtension(f'No import file found: "{import_file}" must be an existing CSV or JSON file of nodes and edges')
+
+        positions: Dict[str, Tuple[float, float]] = {}
+        edge_keys: List[Tuple[str, str]] = []
+        for record in self.read_graph_records(import_file, floor_label):
+            try:
+                if record[0] == 'node':
+                    key, x, y = record[1], float(record[2]), float(record[3])
+                    if key in positions:
+                        raise inkex.AbortExtension(f'Duplicated node "{key}" on "{import_file}"')
+                    positions[key] = (x, y)
+                elif record[0] == 'edge':
+                    edge_keys.append((record[1], record[2]))
+                else:
+                    raise ValueError(f'unknown record kind "{record[0]}"')
+            except (IndexError, ValueError) as error:
+                raise inkex.AbortExtension(f'Invalid record on "{import_file}": {list(record)} ({error})')
+
+        valid_edge_keys = []
+        for key_a, key_b in edge_keys:
+            if key_a not in positions or key_b not in positions:
+                self.msg(f'\n=> Edge "{key_a}" - "{key_b}" links an unknown node, it was not imported')
+                continue
+            valid_edge_keys.append((key_a, key_b))
 
-                # Insert the entrance point into the SVG
-                if should_create_entrance_point:
+        point_ids, edges = self.add_navigation_graph(positions, valid_edge_keys, point_options, connection_options)
+        self.msg(f'\n=> Import DONE: {len(point_ids)} points and {len(edges)} connections imported from "{import_file}"' + 
+                 ('' if connection_options.draw_lines else ' (no lines drawn)'))
 
-                    last_created_point_id_number = next_point_id
+    def add_navigation_graph(self, positions: Dict[Any, Tuple[float, float]], edge_keys: List[Tuple[Any, Any]], 
+                             point_options: EntrancePointOptions, connection_options: PointConnectionOptions) -> Tuple[Dict[Any, int], List[Tuple[int, int]]]:
+        """
+        Creates a whole graph of new navigation points (circles at the given navigation layer positions, by key) and their lines:
+            - point ids are allocated in a single pass after the highest point id of the document, in positions order
+            - every circle and line is created first and then inserted at once in the navigation layer 
+              (lines only if draw_lines is set), points are styled with the point options
+        Duplicated edges and edges linking a point to itself are ignored.
 
-                    # Update the selected object id so that it is now a building with a linked point (entrance)
-                    building_info.el.set('id', building_id_val)  
+        Returns the point id allocated to every key and the created connections (point id pairs).
+        """
+        point_ids: Dict[Any, int] = {}
+        next_point_id = self.get_max_existing_object_id(self.svg.get_ids(), self.get_point_id_number)
+        for key in positions:
+            next_point_id = self.get_next_object_id(next_point_id)
+            point_ids[key] = next_point_id
+
+        # adjacency (deduplicated, undirected)
+        neighbours: Dict[int, List[int]] = {point_id: [] for point_id in point_ids.values()}
+        edges: List[Tuple[int, int]] = []
+        for key_a, key_b in edge_keys:
+            a_id, b_id = point_ids[key_a], point_ids[key_b]
+            if a_id == b_id or b_id in neighbours[a_id]:
+                continue
+            neighbours[a_id].append(b_id)
+            neighbours[b_id].append(a_id)
+            edges.append((a_id, b_id))
+
+        # The elements are new and untransformed, so their attributes are written straight through lxml (same values as
+        # build_connection_line & co.): inkex's get / set wrappers resolve the attribute namespace on every call, which
+        # dominates when creating tens of thousands of elements. Styles and attribute names are resolved once for the batch.
+        point_style = str(inkex.Style({'fill': point_options.point_fill_color, 'stroke': point_options.point_stroke_color, 
+                                       'stroke-width': point_options.point_stroke}))
+        line_style = connection_options.line_style
+        modified_by_attr, x_attr, y_attr, a_id_attr, b_id_attr, length_attr = (
+            inkex.addNS(f'flutter_maps:{name}') for name in ('modified_by_code', 'x', 'y', 'a_id', 'b_id', 'length'))
+
+        new_points = []
+        for key, (x, y) in positions.items():
+            point_id = point_ids[key]
+            point_element = polygons.Circle()
+            point_element.attrib.update({
+                'cx': str(float(x)), 'cy': str(float(y)), 'r': str(float(point_options.point_radius)), 'style': point_style,
+                modified_by_attr: 'inkscape_extension', x_attr: self.format_metadata_number(x), y_attr: self.format_metadata_number(y),
+                'id': self.build_point_id_attr(point_id, neighbours[point_id]),
+            })
+            new_points.append(point_element)
+
+        new_lines = []
+        if connection_options.draw_lines:
+            positions_by_id = {point_ids[key]: position for key, position in positions.items()}
+            for a_id, b_id in edges:
+                a_position, b_position = positions_by_id[a_id], positions_by_id[b_id]
+                line = polygons.PathElement()
+                line.attrib.update({
+                    'd': f'{inkex.paths.Move(*a_position)} {inkex.paths.Line(*b_position)}', 'style': line_style,
+                    modified_by_attr: 'inkscape_extension', a_id_attr: self.encode_id_number(a_id), b_id_attr: self.encode_id_number(b_id),
+                    'id': self.build_nav_line_id(a_id, b_id), length_attr: self.format_metadata_number(math.dist(a_position, b_position)),
+                })
+                new_lines.append(line)
+
+        # single batched insert: lines at the start of the layer (behind the points), points at the end (ids are registered on insertion)
+        points_layer = self.get_navigation_layer()
+        points_layer.extend(new_points)
+        points_layer[0:0] = new_lines
+        # slice assignment bypasses inkex's tree callbacks, so the new line ids are registered by hand
+        for line in new_lines:
+            self.svg.add_to_tree_callback(line)
+        self.change_set.created_points.extend(point_element.get('id') for point_element in new_points)
+        self.change_set.added_lines.extend(line.get('id') for line in new_lines)
+        return point_ids, edges
+
+    MAX_MESH_POINTS = 250000
+    # Grid points (and links) closer than this fraction of the spacing to a ring edge count as lying on the outline
+    MESH_BOUNDARY_TOLERANCE = 1e-6
+    # Max number of (grid point or link, ring edge) pairs tested at once, bounds the memory of the broadcasted arrays
+    MESH_BATCH_PAIRS = 1 << 22
 
-                    entrance_element.set('inkscape:label', f'building_point:{building_id}')
+    @staticmethod
+    def ring_edge_arrays(rings: List[List[Tuple[float, float]]]) -> Tuple['numpy.ndarray', ...]:
+        """ Start x, start y, end x and end y arrays of every edge of the closed rings (the last point links back to the first) """
+        import numpy as np
 
-                    # Set the point id (will not be linked to building id, the building is the only one that links to the point)
-                    entrance_id_val = self.build_point_id_attr(
-                        id=str(next_point_id),
-                        neighbors_list=[]
-                    )
+        starts = np.array([point for ring in rings for point in ring], dtype=float).reshape(-1, 2)
+        ends = np.array([point for ring in rings for point in ring[1:] + ring[:1]], dtype=float).reshape(-1, 2)
+        return starts[:, 0], starts[:, 1], ends[:, 0], ends[:, 1]
 
-                    # entrance element will never be null (its created programatically)
-                    building_info.entrance_element.set('id', entrance_id_val) # type: ignore
+    @classmethod
+    def points_in_rings(cls, xs: 'numpy.ndarray', ys: 'numpy.ndarray', rings: List[List[Tuple[float, float]]], 
+                        tolerance: float) -> Tuple['numpy.ndarray', 'numpy.ndarray']:
+        """
+        Inclusive even-odd test of a whole batch of points (x / y arrays) against the closed rings: a point is inside when it is 
+        inside an odd number of rings (so holes are excluded) or when it lies on a ring edge (within tolerance), holes outlines included.
+        Every point is tested against every ring edge with broadcasted arrays, MESH_BATCH_PAIRS pairs at a time.
 
-                    # Check if there is a "points" layer in the document, otherwise create it
-                    # Then add the entrance point to that layer so we avoid any transform issues with the current layer
-                    query = '//svg:g[@inkscape:groupmode="layer" and @inkscape:label="navigation"]'
-                    layers_search_result = self.svg.xpath(query)
+        :return: the inside mask and the clearance of each point (distance to the nearest ring edge).
+        """
+        import numpy as np
+
+        edge_ax, edge_ay, edge_bx, edge_by = (edge[None, :] for edge in cls.ring_edge_arrays(rings))
+        edge_dx, edge_dy = edge_bx - edge_ax, edge_by - edge_ay
+        edge_length2 = edge_dx * edge_dx + edge_dy * edge_dy
+        edge_length2[edge_length2 == 0] = 1.0  # degenerate edges: the projection below falls on their start point
+
+        inside = np.zeros(len(xs), dtype=bool)
+        clearance = np.zeros(len(xs), dtype=float)
+        batch = max(1, cls.MESH_BATCH_PAIRS // max(1, edge_ax.shape[1]))
+        for start in range(0, len(xs), batch):
+            px, py = xs[start:start + batch, None], ys[start:start + batch, None]
+            # even-odd ray casting towards +x (half-open on y, so a vertex is counted once)
+            straddles = (edge_ay > py) != (edge_by > py)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                crossing_x = edge_ax + (py - edge_ay) * edge_dx / edge_dy
+            odd = np.count_nonzero(straddles & (px < crossing_x), axis=1) % 2 == 1
+            # distance to the nearest point of each edge
+            t = np.clip(((px - edge_ax) * edge_dx + (py - edge_ay) * edge_dy) / edge_length2, 0.0, 1.0)
+            off_x, off_y = px - (edge_ax + t * edge_dx), py - (edge_ay + t * edge_dy)
+            nearest = np.sqrt((off_x * off_x + off_y * off_y).min(axis=1))
+            inside[start:start + batch] = odd | (nearest <= tolerance)
+            clearance[start:start + batch] = nearest
+        return inside, clearance
 
-                    if layers_search_result:
-                        points_layer = layers_search_result[0]
+    @classmethod
+    def segments_in_rings(cls, start_xs: 'numpy.ndarray', start_ys: 'numpy.ndarray', end_xs: 'numpy.ndarray', end_ys: 'numpy.ndarray', 
+                          rings: List[List[Tuple[float, float]]], tolerance: float) -> 'numpy.ndarray':
+        """
+        Whether each segment of a batch (whose ends are already inside, see points_in_rings) stays inside the closed rings: 
+        it must not properly cross any ring edge (running along or touching an edge within tolerance is allowed, same inclusive 
+        rule as the points) and its middle must be inside, which rejects segments leaving the polygon through a vertex.
+        """
+        import numpy as np
+
+        edge_ax, edge_ay, edge_bx, edge_by = (edge[None, :] for edge in cls.ring_edge_arrays(rings))
+        edge_dx, edge_dy = edge_bx - edge_ax, edge_by - edge_ay
+        edge_length = np.hypot(edge_dx, edge_dy)
+        edge_length[edge_length == 0] = np.inf
+
+        crossing = np.zeros(len(start_xs), dtype=bool)
+        batch = max(1, cls.MESH_BATCH_PAIRS // max(1, edge_ax.shape[1]))
+        for start in range(0, len(start_xs), batch):
+            ax, ay = start_xs[start:start + batch, None], start_ys[start:start + batch, None]
+            bx, by = end_xs[start:start + batch, None], end_ys[start:start + batch, None]
+            dx, dy = bx - ax, by - ay
+            length = np.hypot(dx, dy)
+            # orientation signs, 0 when the point is within tolerance of the other segment's line (or the edge is degenerate)
+            side_a = (edge_dx * (ay - edge_ay) - edge_dy * (ax - edge_ax)) / edge_length
+            side_b = (edge_dx * (by - edge_ay) - edge_dy * (bx - edge_ax)) / edge_length
+            side_c = (dx * (edge_ay - ay) - dy * (edge_ax - ax)) / length
+            side_d = (dx * (edge_by - ay) - dy * (edge_bx - ax)) / length
+            sign_a, sign_b, sign_c, sign_d = (np.where(np.abs(side) > tolerance, np.sign(side), 0.0) 
+                                              for side in (side_a, side_b, side_c, side_d))
+            crossing[start:start + batch] = ((sign_a * sign_b < 0) & (sign_c * sign_d < 0)).any(axis=1)
+
+        middle_inside, _ = cls.points_in_rings((start_xs + end_xs) / 2, (start_ys + end_ys) / 2, rings, tolerance)
+        return ~crossing & middle_inside
 
-                    else:
-                        # Create it if it doesn't exist
-                        points_layer = inkex.Layer.new("navigation")
-                        self.svg.add(points_layer)
+    @classmethod
+    def build_polygon_mesh(cls, rings: List[List[Tuple[float, float]]], spacing: float, 
+                           diagonals: bool = False) -> Tuple[set, set]:
+        """
+        Grid cells (i, j), at (i * spacing, j * spacing), inside the polygon defined by the closed rings and the links between 
+        neighbour cells that stay inside it (4-neighbourhood, plus the diagonals for the 8-neighbourhood).
 
-                    # MOVE the layer to the very bottom of the XML tree (Top Z-index)
-                    # Even if it already existed elsewhere, this moves it to the end.
-                    self.svg.append(points_layer)
+        Boundary rule: inclusive. Grid points lying on the outline (within MESH_BOUNDARY_TOLERANCE of the spacing) are kept, 
+        so a spacing aligned rectangle keeps its four sides, and links running along the outline are kept as well. Holes follow 
+        the even-odd rule: their interior is left empty, their outline is kept.
 
-                    # We proceed to normalize the cordinates to obtain the final x and y poisitioning for the points layer 
-                    
-                    # 1. Use the parent's composed transform (since bbox was in parent space)
-                    # This prevents the "double-scaling"
-                    parent_matrix = building_element.getparent().composed_transform()
+        The whole grid of the rings bounding box is tested at once with numpy (see points_in_rings), then the candidate links 
+        between kept neighbours that come close to the outline are tested at once against the ring edges (see segments_in_rings).
+        """
+        import numpy as np
+
+        tolerance = spacing * cls.MESH_BOUNDARY_TOLERANCE
+        all_points = np.array([point for ring in rings for point in ring], dtype=float)
+        (min_x, min_y), (max_x, max_y) = all_points.min(axis=0), all_points.max(axis=0)
+        columns = np.arange(math.ceil(min_x / spacing - cls.MESH_BOUNDARY_TOLERANCE), math.floor(max_x / spacing + cls.MESH_BOUNDARY_TOLERANCE) + 1)
+        rows = np.arange(math.ceil(min_y / spacing - cls.MESH_BOUNDARY_TOLERANCE), math.floor(max_y / spacing + cls.MESH_BOUNDARY_TOLERANCE) + 1)
+        if not len(columns) or not len(rows):
+            return set(), set()
+
+        grid_i, grid_j = np.meshgrid(columns, rows)  # (rows, columns) tables
+        inside, clearance = cls.points_in_rings(grid_i.ravel() * spacing, grid_j.ravel() * spacing, rings, tolerance)
+        inside, clearance = inside.reshape(grid_i.shape), clearance.reshape(grid_i.shape)
+        cells = set(zip(grid_i[inside].tolist(), grid_j[inside].tolist()))
+
+        # candidate links: both neighbours inside, for each (row, column) offset
+        offsets = ((0, 1), (1, 0)) + (((1, 1), (-1, 1)) if diagonals else ())
+        link_starts, link_ends = [], []
+        for row_offset, column_offset in offsets:
+            row_slice = slice(0, len(rows) - row_offset) if row_offset >= 0 else slice(-row_offset, len(rows))
+            next_row_slice = slice(row_offset, len(rows)) if row_offset >= 0 else slice(0, len(rows) + row_offset)
+            both = inside[row_slice, :len(columns) - column_offset] & inside[next_row_slice, column_offset:]
+            start_rows, start_columns = np.nonzero(both)
+            start_rows += row_slice.start
+            link_starts.append((start_columns, start_rows))
+            link_ends.append((start_columns + column_offset, start_rows + row_offset))
+        if not link_starts:
+            return cells, set()
+
+        start_columns, start_rows = (np.concatenate(values) for values in zip(*link_starts))
+        end_columns, end_rows = (np.concatenate(values) for values in zip(*link_ends))
+        start_is, start_js, end_is, end_js = columns[start_columns], rows[start_rows], columns[end_columns], rows[end_rows]
+
+        # a link crossing the outline has an end within half its length of an edge: links whose ends are both farther 
+        # (most of them, away from the outline) are inside without testing them against the edges
+        half_lengths = np.hypot(end_is - start_is, end_js - start_js) * spacing / 2
+        kept = np.minimum(clearance[start_rows, start_columns], clearance[end_rows, end_columns]) > half_lengths + tolerance
+        near_outline = np.flatnonzero(~kept)
+        kept[near_outline] = cls.segments_in_rings(start_is[near_outline] * spacing, start_js[near_outline] * spacing, 
+                                                   end_is[near_outline] * spacing, end_js[near_outline] * spacing, rings, tolerance)
+        links = set(zip(zip(start_is[kept].tolist(), start_js[kept].tolist()), zip(end_is[kept].tolist(), end_js[kept].tolist())))
+        return cells, links
+
+    def fill_navigation_mesh(self, spacing: str = '10px', neighbourhood: int = 4, point_options: EntrancePointOptions = EntrancePointOptions(),
+                             connection_options: PointConnectionOptions = PointConnectionOptions()):
+        """
+        Fills the selected corridor shapes with a grid of navigation points every spacing units (navigation layer coordinates, 
+        the grid is shared so overlapping / adjacent corridors join), linked with their 4 or 8 grid neighbours without leaving the 
+        corridors (see build_polygon_mesh). Points and lines are created with add_navigation_graph.
+        """
+        spacing_value, spacing_unit = self.extract_unit_from_text_expression(spacing)
+        if not spacing_value or not spacing_unit:
+            raise inkex.AbortExtension(f'invalid units value provided for mesh spacing: "{spacing}"')
+        grid_spacing = convert_unit(spacing_value, spacing_unit)
 
-                    # 2. Use the exact points calculated earlier (Position + Displacement)
-                    # We use Vector2d to ensure accurate point-wise math.
-                    final_local_pt = inkex.Vector2d(entrance_x + entrance_dx, entrance_y + entrance_dy)
-                    global_pos = parent_matrix.apply_to_point(final_local_pt)
+        selected_elements = list(self.svg.selected.values())
+        if not selected_elements:
+            raise inkex.AbortExtension('No corridor selected: Select the shapes to fill with navigation points')
 
-                    # 3. Calculate the coordinate relative to the "points" layer
-                    points_layer_transform = points_layer.composed_transform()
-                    local_target = (-points_layer_transform).apply_to_point(global_pos)
+        points_layer = self.get_navigation_layer()
+        cells, links = set(), set()
+        for element in selected_elements:
+            # outline in navigation layer coordinates
+            rings = [[tuple(self.to_element_coordinates(points_layer, point)) for point in ring] 
+                     for ring in self.get_obstacle_outline(element) if len(ring) > 2]
+            if not rings:
+                self.msg(f'\n=> "{element.get("id")}" has no outline, it was not filled')
+                continue
+            all_points = [point for ring in rings for point in ring]
+            width = max(x for x, _ in all_points) - min(x for x, _ in all_points)
+            height = max(y for _, y in all_points) - min(y for _, y in all_points)
+            if (width / grid_spacing + 1) * (height / grid_spacing + 1) > self.MAX_MESH_POINTS:
+                raise inkex.AbortExtension(f'Mesh spacing too small: "{element.get("id")}" would get more than {self.MAX_MESH_POINTS} points')
+
+            shape_cells, shape_links = self.build_polygon_mesh(rings, grid_spacing, diagonals=neighbourhood == 8)
+            cells |= shape_cells
+            links |= shape_links
+
+        # row major order, so point ids follow the grid
+        ordered_cells = sorted(cells, key=lambda cell: (cell[1], cell[0]))
+        positions = {cell: (cell[0] * grid_spacing, cell[1] * grid_spacing) for cell in ordered_cells}
+        point_ids, edges = self.add_navigation_graph(positions, sorted(links, key=lambda link: (link[0][1], link[0][0], link[1][1], link[1][0])), 
+                                                     point_options, connection_options)
+        self.msg(f'\n=> Mesh DONE: {len(point_ids)} points and {len(edges)} connections created in {len(selected_elements)} corridors')
+
+    # Building types whose elements are the same physical object on every floor (matched by type, subtype & id number)
+    VERTICAL_BUILDING_TYPES = (
+        BuildingOptions.BuildingType.SIMPLE_STAIRS,
+        BuildingOptions.BuildingType.ESCALATOR_STAIRS,
+        BuildingOptions.BuildingType.ELEVATOR_STAIRS,
+    )
+
+    def get_floor_layers(self, floor_layers_prefix: str) -> List[inkex.elements.BaseElement]:
+        """ Returns the layers whose label starts with floor_layers_prefix (in document order, sub-layers of a floor excluded) """
+        query = f'//svg:g[@inkscape:groupmode="layer" and starts-with(@inkscape:label, "{floor_layers_prefix}")]'
+        floor_layers = self.svg.xpath(query)
+        floor_layers_set = set(floor_layers)
+        return [layer for layer in floor_layers if not any(ancestor in floor_layers_set for ancestor in layer.iterancestors())]
+
+    def compile_multi_floor_graph(self, floor_layers_prefix: str = 'floor', graph_output: str = '', workers: int = 0, contract_chains: bool = False):
+        """
+        Compiles the navigation graph of every floor layer and writes them as a single multi-floor graph (JSON) to graph_output.
+        With contract_chains, the chains of degree-2 points of each floor are exported as single weighted edges (see compile_floor_graph).
 
-                    # 4. Set the entrance_element position and CLEAR its transform
-                    # We clear the transform because the displacement is now baked into cx/cy.
-                    entrance_element.set('cx', str(local_target.x))
-                    entrance_element.set('cy', str(local_target.y))
-                    entrance_element.transform = None 
+        Each floor is compiled in its own worker process (see compile_floor_graph), then the entrances of the stairs / escalators / elevators
+        sharing type, subtype and id number on different floors are linked, each floor to the next floor where the same building exists.
+        The document is not modified.
+        """
+        import json
+
+        if not graph_output:
+            raise inkex.AbortExtension('No graph output file: A file path is required to write the multi floor graph')
+
+        floor_layers = self.get_floor_layers(floor_layers_prefix)
+        if not floor_layers:
+            raise inkex.AbortExtension(f'No floor layers found: Layers labels must start with "{floor_layers_prefix}"')
+
+        # Floors are sent to the workers as standalone svg documents, wrapped on a group holding the transform above the floor layer
+        from lxml import etree
+        floor_jobs = []
+        for layer in floor_layers:
+            parent = layer.getparent()
+            parent_transform = self.get_composed_transform(parent) if parent is not None else inkex.Transform()
+            floor_svg = f'<svg xmlns="{inkex.NSS["svg"]}" xmlns:inkscape="{inkex.NSS["inkscape"]}"><g transform="{parent_transform}">'.encode() + \
+                etree.tostring(layer) + b'</g></svg>'
+            floor_jobs.append((layer.get('inkscape:label'), floor_svg))
+
+        point_types = [element_type.__name__ for element_type in self.element_types_for_points()]
+        job_args = [(label, floor_svg, self.id_base, point_types, contract_chains) for label, floor_svg in floor_jobs]
+
+        # Compile the floors graphs, in parallel if there is more than one floor to compile
+        workers = workers if workers > 0 else (os.cpu_count() or 1)
+        workers = min(workers, len(job_args))
+        if workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                floors = list(executor.map(compile_floor_graph, *zip(*job_args)))
+        else:
+            floors = [compile_floor_graph(*args) for args in job_args]
+
+        # Link the vertical buildings across floors
+        vertical_types = {tuple(building_type.value.split('-', 1)) for building_type in self.VERTICAL_BUILDING_TYPES}
+        vertical_buildings: Dict[Tuple[str, str, int], List[Tuple[str, List[int]]]] = {}
+        for floor in floors:
+            for b_type, b_subtype, b_id, entrances in floor['buildings']:
+                if (b_type, b_subtype) in vertical_types and entrances:
+                    vertical_buildings.setdefault((b_type, b_subtype, b_id), []).append((floor['label'], entrances))
+
+        cross_floor_edges = []
+        for (b_type, b_subtype, b_id), building_floors in vertical_buildings.items():
+            for (floor_a, entrances_a), (floor_b, entrances_b) in zip(building_floors, building_floors[1:]):
+                cross_floor_edges.append({
+                    'building': f'{b_type}-{b_subtype}-{self.encode_id_number(b_id)}',
+                    'a': {'floor': floor_a, 'point': entrances_a[0]},
+                    'b': {'floor': floor_b, 'point': entrances_b[0]},
+                })
+
+        graph = {
+            'floors': [
+                {
+                    'label': floor['label'],
+                    'nodes': [{'id': point_id, 'x': x, 'y': y} for point_id, (x, y) in floor['nodes'].items()],
+                    'edges': floor['edges'],
+                    'buildings': [
+                        {'type': b_type, 'subtype': b_subtype, 'id': b_id, 'entrances': entrances}
+                        for b_type, b_subtype, b_id, entrances in floor['buildings']
+                    ],
+                    **({'polylines': floor['polylines']} if contract_chains else {}),
+                }
+                for floor in floors
+            ],
+            'cross_floor_edges': cross_floor_edges,
+        }
 
-                    # 5. Add to the layer
-                    points_layer.add(entrance_element)
+        with open(graph_output, 'w', encoding='utf-8') as graph_file:
+            json.dump(graph, graph_file, separators=(',', ':'))
+
+        for floor in floors:
+            self.msg(f'\n=> Floor "{floor["label"]}": {len(floor["nodes"])} points, {len(floor["edges"])} connections, {len(floor["buildings"])} buildings' + 
+                     (f' ({floor["contracted_points"]} points contracted into {len(floor["polylines"])} chains)' if contract_chains else ''))
+        self.msg(f'\n=> {len(cross_floor_edges)} cross floor connections. Multi floor graph written to "{graph_output}"')
+
+
+def compile_floor_graph(label: str, floor_svg: bytes, id_base: int, point_types: List[str], contract_chains: bool = False) -> Dict[str, Any]:
+    """
+    Compiles the navigation graph of a single floor (module level so it can run on a worker process).
+
+    Returns a dict with the floor label, its points centers in document coordinates (by point id number), 
+    its deduplicated undirected connections between points of the floor and its buildings as (type, subtype, id, entrances).
+
+    With contract_chains, every chain of degree-2 points (building entrances excluded) is replaced by a single edge between
+    the points at its ends: edges become [A, B, length] (length of the path in document units), the contracted points are
+    dropped from the nodes and the geometry of every contracted edge is kept on 'polylines' ({'edge': edge index, 'points': [[x, y], ...]}).
+    """
+    from array import array
+
+    FlutterMapExtension.set_id_base(id_base)
+    valid_elements = tuple(getattr(polygons, type_name) for type_name in point_types)
+    floor_root = inkex.load_svg(floor_svg).getroot()
+
+    nodes: Dict[int, Tuple[float, float]] = {}
+    link_sources, link_targets = array('i'), array('i')  # point links as parsed from the ids, straight into the CSR arrays
+    buildings = []
+    parent_transforms: Dict[Any, inkex.Transform] = {}  # composed transform of each parent, resolved once
+    for element in floor_root.xpath('//*[@id]'):
+        id_str = element.get('id')
+        point_id, neighbours = FlutterMapExtension.parse_point_id(id_str)
+        if point_id is not None:
+            if isinstance(element, valid_elements):
+                if isinstance(element, (polygons.Circle, polygons.Ellipse)):
+                    # exact center: cx / cy through the composed transform (bounding boxes are computed from an approximated path)
+                    parent = element.getparent()
+                    if parent not in parent_transforms:
+                        parent_transforms[parent] = parent.composed_transform()
+                    center = (parent_transforms[parent] @ element.transform).apply_to_point(
+                        (float(element.get('cx') or 0), float(element.get('cy') or 0)))
+                else:
+                    center = element.bounding_box(True).center
+                nodes[point_id] = (center.x, center.y)
+                link_sources.extend(point_id for _ in neighbours)
+                link_targets.extend(int(neighbour) for neighbour in neighbours)
+            continue
+        b_type, b_subtype, b_id, entrances = FlutterMapExtension.parse_building_id(id_str)
+        if b_id is not None:
+            buildings.append((b_type, b_subtype, b_id, entrances))
+
+    compact_graph = CompactGraph.from_links(array('i', nodes), link_sources, link_targets)
+    compact_graph.xs.extend(nodes[point_id][0] for point_id in compact_graph.node_ids)
+    compact_graph.ys.extend(nodes[point_id][1] for point_id in compact_graph.node_ids)
+    if not contract_chains:
+        edges = [[compact_graph.node_ids[a], compact_graph.node_ids[b]] for a, b in compact_graph.edges()]
+        return {'label': label, 'nodes': nodes, 'edges': edges, 'buildings': buildings}
+
+    entrances_ids = {entrance_id for *_, entrances in buildings for entrance_id in entrances}
+    keep = array('b', (1 if point_id in entrances_ids else 0 for point_id in compact_graph.node_ids))
+    xs, ys = compact_graph.xs, compact_graph.ys
+    edges, polylines, kept_points = [], [], set()
+    for a, b, path in compact_graph.contract_chains(keep):
+        length = sum(math.hypot(xs[q] - xs[p], ys[q] - ys[p]) for p, q in zip(path, path[1:]))
+        edges.append([compact_graph.node_ids[a], compact_graph.node_ids[b], length])
+        if len(path) > 2:
+            polylines.append({'edge': len(edges) - 1, 'points': [[xs[index], ys[index]] for index in path]})
+        kept_points.update((compact_graph.node_ids[a], compact_graph.node_ids[b]))
+    # points without any link are kept as well (they are not part of any chain)
+    kept_points.update(point_id for index, point_id in enumerate(compact_graph.node_ids) if compact_graph.degree(index) == 0)
+    kept_nodes = {point_id: position for point_id, position in nodes.items() if point_id in kept_points}
+    return {'label': label, 'nodes': kept_nodes, 'edges': edges, 'buildings': buildings, 'polylines': polylines,
+            'contracted_points': len(nodes) - len(kept_nodes)}
 
 if __name__ == '__main__':
     try:
@@ -0,0 +1,42 @@
+"""
+Helpers running the extension in-process on an svg string, as Inkscape does (document file in, document out if changed).
+"""
+import contextlib
+import io
+import os
+import re
+import sys
+import tempfile
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flutter_map_extension import FlutterMapExtension
+
+SVG_HEADER = ('<svg xmlns="http://www.w3.org/2000/svg" xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape" '
+              'xmlns:sodipodi="http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd" width="2000" height="2000">')
+
+# Small point & line styles so the runs do not depend on the document units
+POINT_STYLE_ARGS = ['--point_radius=1px', '--point_stroke=0.5px', '--line_stroke_width=0.2px']
+
+
+def svg_document(body: str) -> str:
+    return f'{SVG_HEADER}{body}</svg>'
+
+
+def run_extension(svg: str, *args: str) -> Tuple[FlutterMapExtension, str, str]:
+    """ Runs the extension with args on the svg document, returns the extension, the written output ('' if nothing was written) and the messages """
+    with tempfile.TemporaryDirectory() as directory:
+        input_path = os.path.join(directory, 'input.svg')
+        with open(input_path, 'w', encoding='utf-8') as input_file:
+            input_file.write(svg)
+        output, messages = io.BytesIO(), io.StringIO()
+        extension = FlutterMapExtension()
+        with contextlib.redirect_stderr(messages):
+            extension.run([*POINT_STYLE_ARGS, *args, input_path], output=output)
+    return extension, output.getvalue().decode('utf-8'), messages.getvalue()
+
+
+def line_ids(document: str) -> List[str]:
+    """ Sorted ids of the nav_lines of a written document """
+    return sorted(re.findall(r'id="(nav_line-[^"]+)"', document))
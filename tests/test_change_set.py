@@ -0,0 +1,66 @@
+"""
+The document is only written back when the operation recorded a change into the ChangeSet (see FlutterMapExtension.has_changed).
+Run with: python -m unittest discover tests
+"""
+import unittest
+
+from extension_run import run_extension, svg_document
+
+
+def navigation_layer(body: str) -> str:
+    return svg_document(f'<g inkscape:groupmode="layer" inkscape:label="navigation" id="navigation">{body}</g>')
+
+
+class ChangeSetWriteBackTest(unittest.TestCase):
+
+    def assert_written_back(self, document: str, *args: str) -> str:
+        extension, output, _ = run_extension(document, *args)
+        self.assertTrue(extension.has_changed(None))
+        self.assertTrue(output)
+        self.assertNotEqual(output, document)
+        return output
+
+    def test_connect_is_written_back(self):
+        document = navigation_layer('<circle id="point-1" cx="0" cy="0" r="1"/><circle id="point-2" cx="10" cy="0" r="1"/>')
+        output = self.assert_written_back(document, '--operation_mode=connect', '--id=point-1', '--id=point-2')
+        self.assertIn('id="nav_line-1-2"', output)
+
+    def test_renumbered_ids_are_written_back(self):
+        document = navigation_layer('<circle id="point-7=9" cx="0" cy="0" r="1"/><circle id="point-9=7" cx="10" cy="0" r="1"/>')
+        output = self.assert_written_back(document, '--operation_mode=clean_ids', '--id_replace_type=renumber')
+        self.assertIn('id="point-1=2"', output)
+        self.assertIn('id="point-2=1"', output)
+
+    def test_merged_points_are_written_back(self):
+        document = navigation_layer(
+            '<circle id="point-1=2" cx="0" cy="0" r="1"/><circle id="point-2=1" cx="10" cy="0" r="1"/>'
+            '<circle id="point-3=2" cx="10" cy="0" r="1"/>'
+        )
+        output = self.assert_written_back(document, '--operation_mode=merge_points')
+        self.assertNotIn('id="point-3=2"', output)
+
+    def test_added_building_is_written_back(self):
+        document = svg_document(
+            '<g inkscape:groupmode="layer" inkscape:label="shops" id="shops"><rect id="rect1" x="0" y="0" width="20" height="20"/></g>'
+        )
+        output = self.assert_written_back(document, '--operation_mode=add_building', '--id=rect1')
+        self.assertIn('id="shop-1=1"', output)
+        self.assertIn('building_id="1"', output)
+
+    def test_no_op_run_writes_nothing(self):
+        # no coincident points: merge_points records no change
+        document = navigation_layer('<circle id="point-1=2" cx="0" cy="0" r="1"/><circle id="point-2=1" cx="10" cy="0" r="1"/>')
+        extension, output, messages = run_extension(document, '--operation_mode=merge_points')
+        self.assertFalse(extension.has_changed(None))
+        self.assertEqual(output, '')
+        self.assertIn('Nothing changed', messages)
+
+    def test_dry_run_writes_nothing(self):
+        document = navigation_layer('<circle id="point-7=9" cx="0" cy="0" r="1"/><circle id="point-9=7" cx="10" cy="0" r="1"/>')
+        extension, output, _ = run_extension(document, '--operation_mode=clean_ids', '--id_replace_type=renumber', '--dry_run=true')
+        self.assertFalse(extension.has_changed(None))
+        self.assertEqual(output, '')
+
+
+if __name__ == '__main__':
+    unittest.main()
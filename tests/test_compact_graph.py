@@ -0,0 +1,65 @@
+"""
+CompactGraph built from the flat id arrays, and the navigation graph round trip between the DOM ids and the CSR arrays.
+Run with: python -m unittest discover tests
+"""
+import re
+import unittest
+from array import array
+
+from extension_run import run_extension, svg_document
+
+from flutter_map_extension import CompactGraph
+
+
+class CompactGraphTest(unittest.TestCase):
+
+    def test_links_are_symmetric_and_deduplicated(self):
+        # 3 lists 1 (not listed back), 5 lists 3 twice, 3 lists itself and the missing 9
+        graph = CompactGraph.from_links(array('i', [3, 1, 5]), array('i', [3, 3, 3, 5, 5]), array('i', [1, 9, 3, 3, 3]), handles=['c', 'a', 'e'])
+        self.assertEqual(list(graph.node_ids), [1, 3, 5])
+        self.assertEqual(graph.handles, ['a', 'c', 'e'])
+        self.assertEqual([graph.neighbour_ids(index) for index in range(len(graph))], [[3], [1, 5], [3]])
+        self.assertIn(5, graph)
+        self.assertNotIn(9, graph)
+
+    def test_repeated_ids_keep_the_last_node(self):
+        graph = CompactGraph.from_links(array('i', [2, 2]), array('i'), array('i'), handles=['first', 'last'])
+        self.assertEqual(list(graph.node_ids), [2])
+        self.assertEqual(graph.handles, ['last'])
+
+    def test_from_adjacency_matches_from_links(self):
+        adjacency = {4: [2, 7], 2: [4], 7: [], 9: [4, 2]}
+        graph = CompactGraph.from_adjacency(adjacency, coordinates={4: (0, 0), 2: (1, 0), 7: (2, 0), 9: (3, 0)})
+        self.assertEqual(list(graph.node_ids), [2, 4, 7, 9])
+        self.assertEqual(list(graph.xs), [1, 0, 2, 3])
+        self.assertEqual(list(graph.connected_components()), [0, 0, 0, 0])
+
+
+class NavigationGraphIdsTest(unittest.TestCase):
+
+    def point_ids(self, document: str) -> list:
+        return sorted(re.findall(r'id="(point-[^"]+)"', document))
+
+    def test_clean_rewrites_the_points_referencing_missing_points(self):
+        document = svg_document(
+            '<g inkscape:groupmode="layer" inkscape:label="navigation" id="navigation">'
+            '<circle id="point-1=2-7" cx="0" cy="0" r="1"/><circle id="point-2=1" cx="10" cy="0" r="1"/>'
+            '</g>'
+        )
+        _, output, _ = run_extension(document, '--operation_mode=clean')
+        self.assertEqual(self.point_ids(output), ['point-1=2', 'point-2=1'])
+
+    def test_merge_writes_the_merged_links_back(self):
+        # point-3 is stacked on point-2: its link to point-4 moves to point-2
+        document = svg_document(
+            '<g inkscape:groupmode="layer" inkscape:label="navigation" id="navigation">'
+            '<circle id="point-1=2" cx="0" cy="0" r="1"/><circle id="point-2=1" cx="10" cy="0" r="1"/>'
+            '<circle id="point-3=4" cx="10" cy="0" r="1"/><circle id="point-4=3" cx="20" cy="0" r="1"/>'
+            '</g>'
+        )
+        _, output, _ = run_extension(document, '--operation_mode=merge_points')
+        self.assertEqual(self.point_ids(output), ['point-1=2', 'point-2=1-4', 'point-4=2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+"""
+Base-36 id encoding runs, and the class level id base they switch.
+Run with: python -m unittest discover tests
+"""
+import re
+import unittest
+
+from extension_run import run_extension, svg_document
+
+from flutter_map_extension import FlutterMapExtension
+
+DECIMAL_POINTS = svg_document(
+    '<g inkscape:groupmode="layer" inkscape:label="navigation" id="navigation">'
+    '<circle id="point-35=36" cx="0" cy="0" r="1"/><circle id="point-36=35" cx="10" cy="0" r="1"/>'
+    '</g>'
+)
+
+
+class IdEncodingTest(unittest.TestCase):
+
+    def test_base36_run_does_not_leak_into_the_process(self):
+        _, output, _ = run_extension(DECIMAL_POINTS, '--operation_mode=clean', '--id_encoding=base36')
+        self.assertEqual(sorted(re.findall(r'id="(point-[^"]+)"', output)), ['point-10=z', 'point-z=10'])
+
+        self.assertEqual(FlutterMapExtension.id_base, 10)
+        self.assertIs(FlutterMapExtension.POINT_ID_REGEX, FlutterMapExtension.DECIMAL_ID_REGEXES[0])
+        self.assertEqual(FlutterMapExtension.parse_point_id('point-10=11'), (10, [11]))
+        self.assertEqual(FlutterMapExtension.encode_id_number(35), '35')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+Import-time benchmark of the extension module (python -X importtime).
+
+Every extension run starts a fresh Python process, so the modules only needed by some operation modes
+(json / csv / gzip writers, the multi floor process pool, the spatial index heap, the graph arrays, logging...) 
+must be imported by those modes only: loading the extension must not load anything on top of inkex.
+Run with: python -m unittest discover tests
+"""
+import os
+import subprocess
+import sys
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules imported inside the operation modes that need them, never on module load
+DEFERRED_MODULES = ('logging', 'json', 'csv', 'gzip', 'concurrent.futures', 'multiprocessing', 'array', 'heapq', 
+                    'inkscape_ExtensionDevTools')
+
+# Budget for the module's own load time (inkex excluded, about 50 ms here), only meant to catch heavy work creeping back
+MAX_OWN_IMPORT_SECONDS = 0.5
+
+
+def import_times(statement: str) -> dict:
+    """ Runs statement on a fresh interpreter with -X importtime, returns {module: cumulative microseconds} """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], cwd=REPO_ROOT,
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line.split('|')
+        times[module.strip()] = int(cumulative)
+    return times
+
+
+class ImportTimeTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # warm up: compiles the module bytecode so the measured import does not include it
+        import_times('import flutter_map_extension')
+        cls.inkex_modules = import_times('import inkex')
+        cls.extension_modules = import_times('import flutter_map_extension')
+
+    def test_mode_specific_modules_are_deferred(self):
+        for module in DEFERRED_MODULES:
+            if module in self.inkex_modules:
+                continue  # already loaded by inkex itself, nothing the extension can defer
+            self.assertFalse(module in self.extension_modules, f'{module} is imported on module load')
+
+    def test_no_extra_modules_on_top_of_inkex(self):
+        extra_modules = set(self.extension_modules) - set(self.inkex_modules)
+        self.assertEqual(extra_modules, {'flutter_map_extension'})
+
+    def test_own_import_time(self):
+        own_seconds = (self.extension_modules['flutter_map_extension'] - self.extension_modules.get('inkex', 0)) / 1e6
+        self.assertLess(own_seconds, MAX_OWN_IMPORT_SECONDS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+"""
+Merging coincident points next to building entrances (see FlutterMapExtension.merge_points).
+Run with: python -m unittest discover tests
+"""
+import re
+import unittest
+
+from extension_run import run_extension, svg_document
+
+
+def floor(buildings: str, points: str) -> str:
+    return svg_document(
+        f'<g inkscape:groupmode="layer" inkscape:label="shops" id="shops">{buildings}</g>'
+        f'<g inkscape:groupmode="layer" inkscape:label="navigation" id="navigation">{points}</g>'
+    )
+
+
+class MergeEntrancesTest(unittest.TestCase):
+
+    def ids(self, document: str, prefix: str) -> list:
+        return sorted(re.findall(rf'id="({prefix}-[^"]+)"', document))
+
+    def test_entrances_of_different_buildings_are_kept_apart(self):
+        # two shops sharing a wall with their entrances stacked on a corridor point linked to point-4
+        document = floor(
+            '<rect id="shop-1=1" x="0" y="0" width="10" height="10"/><rect id="shop-2=2" x="10" y="0" width="10" height="10"/>',
+            '<circle id="point-1=3" cx="10" cy="5" r="1"/><circle id="point-2=3" cx="10" cy="5" r="1"/>'
+            '<circle id="point-3=1-2-4" cx="10" cy="5" r="1"/><circle id="point-4=3" cx="30" cy="5" r="1"/>'
+        )
+        _, output, messages = run_extension(document, '--operation_mode=merge_points')
+        self.assertEqual(self.ids(output, 'shop'), ['shop-1=1', 'shop-2=2'])
+        self.assertEqual(self.ids(output, 'point'), ['point-1=2-4', 'point-2=1', 'point-4=1'])
+        self.assertIn('belong to other buildings', messages)
+
+    def test_only_entrances_of_different_buildings_change_nothing(self):
+        document = floor(
+            '<rect id="shop-1=1" x="0" y="0" width="10" height="10"/><rect id="shop-2=2" x="10" y="0" width="10" height="10"/>',
+            '<circle id="point-1" cx="10" cy="5" r="1"/><circle id="point-2" cx="10" cy="5" r="1"/>'
+        )
+        extension, output, _ = run_extension(document, '--operation_mode=merge_points')
+        self.assertFalse(extension.has_changed(None))
+        self.assertEqual(output, '')
+
+
+if __name__ == '__main__':
+    unittest.main()
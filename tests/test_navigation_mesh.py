@@ -0,0 +1,58 @@
+"""
+Navigation mesh grid (build_polygon_mesh) checked on shapes whose points and links can be counted by hand.
+Run with: python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flutter_map_extension import FlutterMapExtension
+
+
+def grid_links(columns: int, rows: int, diagonals: bool = False) -> int:
+    """ Number of links of a full columns x rows grid """
+    links = (columns - 1) * rows + columns * (rows - 1)
+    return links + 2 * (columns - 1) * (rows - 1) if diagonals else links
+
+
+class PolygonMeshTest(unittest.TestCase):
+
+    def test_aligned_rectangle_keeps_every_side(self):
+        rectangle = [[(0, 0), (100, 0), (100, 50), (0, 50)]]
+        for diagonals in (False, True):
+            cells, links = FlutterMapExtension.build_polygon_mesh(rectangle, 10, diagonals=diagonals)
+            self.assertEqual(cells, {(i, j) for i in range(11) for j in range(6)})
+            self.assertEqual(len(links), grid_links(11, 6, diagonals))
+
+    def test_floating_point_spacing(self):
+        rectangle = [[(0.1, 0.1), (0.7, 0.1), (0.7, 0.3), (0.1, 0.3)]]
+        cells, links = FlutterMapExtension.build_polygon_mesh(rectangle, 0.1)
+        self.assertEqual(cells, {(i, j) for i in range(1, 8) for j in range(1, 4)})
+        self.assertEqual(len(links), grid_links(7, 3))
+
+    def test_hole_interior_is_left_empty(self):
+        square_with_hole = [[(0, 0), (60, 0), (60, 60), (0, 60)], [(20, 20), (40, 20), (40, 40), (20, 40)]]
+        cells, links = FlutterMapExtension.build_polygon_mesh(square_with_hole, 10)
+        self.assertEqual(cells, {(i, j) for i in range(7) for j in range(7)} - {(3, 3)})
+        # the hole outline is kept, with the links along it
+        self.assertIn(((2, 2), (3, 2)), links)
+        self.assertEqual(len(links), grid_links(7, 7) - 4)
+
+    def test_links_do_not_leave_concave_shapes(self):
+        # U shape: the columns x = 0..10 and x = 30..40 joined by the bottom strip y = 30..40
+        u_shape = [[(0, 0), (10, 0), (10, 30), (30, 30), (30, 0), (40, 0), (40, 40), (0, 40)]]
+        cells, links = FlutterMapExtension.build_polygon_mesh(u_shape, 10, diagonals=True)
+        self.assertNotIn((2, 0), cells)
+        self.assertIn((1, 0), cells)
+        self.assertIn((3, 0), cells)
+        for start, end in links:
+            # no link goes through the gap between the two columns (10 < x < 30, y < 30)
+            middle_x, middle_y = (start[0] + end[0]) * 5, (start[1] + end[1]) * 5
+            self.assertFalse(10 < middle_x < 30 and middle_y < 30, f'{start} - {end} leaves the shape')
+        self.assertNotIn(((1, 2), (2, 3)), links)  # diagonal through the inner corner leaves the shape
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+"""
+Operation scopes walking layers or the whole document instead of the selection (see FlutterMapExtension.get_scope_elements).
+Run with: python -m unittest discover tests
+"""
+import re
+import unittest
+
+from extension_run import run_extension, svg_document
+
+# A shop drawn on its own layer, next to the layers the extension itself works with or generates
+FLOOR_LAYERS = svg_document(
+    '<g inkscape:groupmode="layer" inkscape:label="shops" id="shops">'
+    '<rect id="rect1" x="0" y="0" width="20" height="20"/>'
+    '<g inkscape:groupmode="layer" inkscape:label="kiosks" id="kiosks"><rect id="rect2" x="50" y="0" width="10" height="10"/></g>'
+    '</g>'
+    '<g inkscape:groupmode="layer" inkscape:label="walls" id="walls"><path id="wall1" d="M 0 40 L 100 40"/></g>'
+    '<g inkscape:groupmode="layer" inkscape:label="connectivity_report" id="report"><circle id="marker1" cx="5" cy="5" r="3"/></g>'
+    '<g inkscape:groupmode="layer" inkscape:label="navigation" id="navigation">'
+    '<circle id="point-1=2" cx="0" cy="100" r="1"/><circle id="point-2=1" cx="10" cy="100" r="1"/>'
+    '<rect id="legend" x="0" y="200" width="5" height="5"/>'
+    '</g>'
+)
+
+
+class AddBuildingScopeTest(unittest.TestCase):
+
+    def building_ids(self, document: str) -> list:
+        return sorted(re.findall(r'id="((?!point-)[a-z]+-\d+=\d+)"', document))
+
+    def test_document_scope_skips_the_navigation_walls_and_report_layers(self):
+        _, output, _ = run_extension(FLOOR_LAYERS, '--operation_mode=add_building', '--scope=document')
+        self.assertEqual(self.building_ids(output), ['shop-1=3', 'shop-2=4'])
+        for untouched_id in ('wall1', 'marker1', 'legend'):
+            self.assertIn(f'id="{untouched_id}"', output)
+
+    def test_custom_walls_layer_is_skipped(self):
+        document = FLOOR_LAYERS.replace('inkscape:label="walls"', 'inkscape:label="partitions"')
+        _, output, _ = run_extension(document, '--operation_mode=add_building', '--scope=document', '--walls_layer=partitions')
+        self.assertEqual(self.building_ids(output), ['shop-1=3', 'shop-2=4'])
+        self.assertIn('id="wall1"', output)
+
+    def test_named_layer_scope_enters_sublayers(self):
+        _, output, _ = run_extension(FLOOR_LAYERS, '--operation_mode=add_building', '--scope=named_layer', '--scope_layer=kiosks')
+        self.assertEqual(self.building_ids(output), ['shop-1=3'])
+        self.assertIn('id="rect1"', output)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+Smart connect algorithms run on small documents whose expected connections are known.
+Run with: python -m unittest discover tests
+"""
+import unittest
+
+from extension_run import line_ids, run_extension, svg_document
+
+# point-1 is drawn at cx=0 inside a translated group: its document x is 1000, next to point-3 (x=1004), far from point-2 (x=5)
+TRANSFORMED_POINTS = svg_document(
+    '<g inkscape:groupmode="layer" inkscape:label="points" id="points">'
+    '<g transform="translate(1000,0)"><circle id="point-1" cx="0" cy="100" r="1"/></g>'
+    '<circle id="point-2" cx="5" cy="100" r="1"/>'
+    '<circle id="point-3" cx="1004" cy="100" r="1"/>'
+    '</g>'
+)
+
+# shop-1 stands between point-1 and point-2, point-3 sees both of them
+OBSTRUCTED_POINTS = svg_document(
+    '<g inkscape:groupmode="layer" inkscape:label="shops" id="shops"><rect id="shop-1=9" x="40" y="80" width="20" height="40"/></g>'
+    '<g inkscape:groupmode="layer" inkscape:label="points" id="points">'
+    '<circle id="point-1" cx="0" cy="100" r="1"/>'
+    '<circle id="point-2" cx="100" cy="100" r="1"/>'
+    '<circle id="point-3" cx="0" cy="0" r="1"/>'
+    '</g>'
+)
+
+
+class SmartConnectTest(unittest.TestCase):
+
+    def connect(self, document: str, smart_connect_type: str, *args: str) -> str:
+        _, output, _ = run_extension(document, '--operation_mode=connect', '--scope=document', '--smart_connect_enabled=true',
+                                     f'--smart_connect_type={smart_connect_type}', *args)
+        return output
+
+    def test_axis_aligned_uses_document_coordinates(self):
+        output = self.connect(TRANSFORMED_POINTS, 'axis_aligned', '--max_radius=10px')
+        self.assertEqual(line_ids(output), ['nav_line-1-3'])
+
+    def test_nearest_point_uses_document_coordinates(self):
+        output = self.connect(TRANSFORMED_POINTS, 'nearest_point', '--max_radius=10px')
+        self.assertEqual(line_ids(output), ['nav_line-1-3'])
+
+    def test_visibility_graph_uses_document_coordinates(self):
+        output = self.connect(TRANSFORMED_POINTS, 'visibility_graph', '--visibility_max_radius=10px')
+        self.assertEqual(line_ids(output), ['nav_line-1-3'])
+
+    def test_visibility_graph_without_radius_links_every_visible_pair(self):
+        # the max radius of the other algorithms (0.1px by default) is not used
+        output = self.connect(TRANSFORMED_POINTS, 'visibility_graph')
+        self.assertEqual(line_ids(output), ['nav_line-1-2', 'nav_line-1-3', 'nav_line-2-3'])
+
+    def test_visibility_graph_skips_obstructed_pairs(self):
+        output = self.connect(OBSTRUCTED_POINTS, 'visibility_graph')
+        self.assertEqual(line_ids(output), ['nav_line-1-3', 'nav_line-2-3'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+BoundingBoxRTree queries checked (and timed) against brute force scans over the same entries.
+Run with: python -m unittest discover tests
+"""
+import math
+import os
+import random
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flutter_map_extension import BoundingBoxRTree
+
+
+# Min speedup of the tree queries over the brute force scans in the benchmark
+MIN_SPEEDUP = 10
+
+
+def random_entries(count: int, seed: int, size: float = 1000.0, max_box: float = 5.0) -> list:
+    """ Point-like (degenerate) and small boxes spread over a size x size floor, items are their index """
+    generator = random.Random(seed)
+    entries = []
+    for index in range(count):
+        x, y = generator.uniform(0, size), generator.uniform(0, size)
+        width, height = (0.0, 0.0) if index % 2 else (generator.uniform(0, max_box), generator.uniform(0, max_box))
+        entries.append(((x, y, x + width, y + height), index))
+    return entries
+
+
+def brute_force_query(entries: list, min_x: float, min_y: float, max_x: float, max_y: float) -> list:
+    return [item for box, item in entries if not (box[0] > max_x or box[2] < min_x or box[1] > max_y or box[3] < min_y)]
+
+
+def box_distance(box, x: float, y: float) -> float:
+    dx = max(box[0] - x, 0.0, x - box[2])
+    dy = max(box[1] - y, 0.0, y - box[3])
+    return math.sqrt(dx * dx + dy * dy)
+
+
+def brute_force_nearest(entries: list, x: float, y: float, max_distance: float) -> list:
+    """ (distance, item) within max_distance, by increasing distance (ties in insertion order, as the tree yields them) """
+    found = [(box_distance(box, x, y), order, item) for order, (box, item) in enumerate(entries)]
+    return [(distance, item) for distance, _, item in sorted(found) if distance <= max_distance]
+
+
+class BoundingBoxRTreeTest(unittest.TestCase):
+
+    def test_query_matches_brute_force(self):
+        entries = random_entries(5000, seed=1)
+        tree = BoundingBoxRTree(entries)
+        generator = random.Random(2)
+        for _ in range(200):
+            x, y, side = generator.uniform(0, 1000), generator.uniform(0, 1000), generator.uniform(0, 80)
+            self.assertEqual(sorted(tree.query(x, y, x + side, y + side)), sorted(brute_force_query(entries, x, y, x + side, y + side)))
+
+    def test_nearest_matches_brute_force(self):
+        entries = random_entries(5000, seed=3)
+        tree = BoundingBoxRTree(entries)
+        generator = random.Random(4)
+        for _ in range(100):
+            x, y, radius = generator.uniform(0, 1000), generator.uniform(0, 1000), generator.uniform(0, 60)
+            self.assertEqual(list(tree.nearest(x, y, radius)), brute_force_nearest(entries, x, y, radius))
+
+    def test_nearest_within_test(self):
+        entries = random_entries(3000, seed=5)
+        tree = BoundingBoxRTree(entries)
+        # only the entries fully right of x = 500
+        right_half = lambda min_x, min_y, max_x, max_y: max_x >= 500
+        expected = [(distance, item) for distance, item in brute_force_nearest(entries, 400, 500, 200) if entries[item][0][2] >= 500]
+        self.assertEqual(list(tree.nearest(400, 500, 200, within=right_half)), expected)
+
+    def test_insert_and_delete(self):
+        entries = random_entries(2000, seed=6)
+        tree = BoundingBoxRTree(entries[:1000])
+        for box, item in entries[1000:]:
+            tree.insert(box, item)
+        deleted = entries[::3]
+        for box, item in deleted:
+            self.assertTrue(tree.delete(box, item))
+        self.assertFalse(tree.delete(deleted[0][0], deleted[0][1]))
+
+        remaining = [entry for index, entry in enumerate(entries) if index % 3]
+        self.assertEqual(len(tree), len(remaining))
+        self.assertEqual(sorted(tree.query(-1, -1, 2000, 2000)), sorted(item for _, item in remaining))
+        self.assertEqual([item for _, item in tree.nearest(500, 500, 50)], [item for _, item in brute_force_nearest(remaining, 500, 500, 50)])
+
+    def test_benchmark_against_brute_force(self):
+        entries = random_entries(20000, seed=7)
+        generator = random.Random(8)
+        queries = [(generator.uniform(0, 1000), generator.uniform(0, 1000)) for _ in range(100)]
+
+        tree = BoundingBoxRTree(entries)
+
+        start = time.perf_counter()
+        tree_results = [tree.query(x - 20, y - 20, x + 20, y + 20) for x, y in queries]
+        tree_nearest = [next(tree.nearest(x, y), None) for x, y in queries]
+        tree_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        brute_results = [brute_force_query(entries, x - 20, y - 20, x + 20, y + 20) for x, y in queries]
+        brute_nearest = [min(((box_distance(box, x, y), item) for box, item in entries), default=None) for x, y in queries]
+        brute_seconds = time.perf_counter() - start
+
+        self.assertEqual([sorted(found) for found in tree_results], [sorted(found) for found in brute_results])
+        self.assertEqual([distance for distance, _ in tree_nearest], [distance for distance, _ in brute_nearest])
+        # about 200x faster here, the bound only leaves room for noisy machines
+        self.assertLess(tree_seconds * MIN_SPEEDUP, brute_seconds)
+
+
+if __name__ == '__main__':
+    unittest.main()